@@ -0,0 +1,126 @@
+"""
+Porównanie providerów JSON na syntetycznych odpowiedziach w kształcie
+/orders, /orders/closed, /reservations i /raports/day.
+
+Uruchomienie (z katalogu repozytorium):
+    python -m benchmarks.json_serialization [--repeat 20]
+"""
+import argparse
+import random
+import timeit
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from flask import Flask
+
+from flask_api.json_provider import OrjsonProvider, StdlibJSONProvider, orjson
+
+
+def _orders(tables: int = 60, orders_per_table: int = 4, items_per_order: int = 8, closed: bool = False) -> list:
+    rnd = random.Random(1)
+    start = datetime(2026, 1, 10, 12, 0)
+    result = []
+    item_id = 0
+    for table_id in range(1, tables + 1):
+        orders = []
+        for n in range(orders_per_table):
+            items = []
+            for _ in range(items_per_order):
+                item_id += 1
+                price = Decimal(rnd.randrange(500, 9000)) / 100
+                qty = rnd.randint(1, 4)
+                item = {"ItemId": item_id, "Name": f"Pozycja {item_id % 120}", "Qty": qty, "IsServed": rnd.random() < 0.7}
+                if closed:
+                    item["Price"] = price
+                    item["LineTotal"] = price * qty
+                items.append(item)
+            order = {
+                "OrderId": table_id * 100 + n,
+                "Items": items,
+                "IsServed": False,
+                "IsSettled": closed,
+                "CreatedAt": start + timedelta(minutes=rnd.randrange(600), microseconds=rnd.randrange(10 ** 6)),
+            }
+            if closed:
+                order["Notes"] = "bez cebuli" if rnd.random() < 0.2 else ""
+                order["WaiterId"] = rnd.randint(1, 12)
+            orders.append(order)
+        result.append({"TableId": table_id, "Orders": orders})
+    return result
+
+
+def _reservations(count: int = 3000) -> list:
+    rnd = random.Random(2)
+    result = []
+    for rid in range(1, count + 1):
+        d = date(2026, 1, 1) + timedelta(days=rnd.randrange(60))
+        t = time(rnd.randrange(12, 22), rnd.choice((0, 15, 30, 45)))
+        result.append({
+            "Id": rid,
+            "FirstName": "Łukasz",
+            "LastName": "Wiśniewski",
+            "Phone": "600100200",
+            "PeopleCount": rnd.randint(1, 8),
+            "Date": d,
+            "Time": t,
+            "StartTime": f"{d}T{t}",
+            "Approved": rnd.random() < 0.5,
+            "TableId": rnd.choice((None, rnd.randint(1, 60))),
+        })
+    return result
+
+
+def _report_day(entries: int = 200) -> dict:
+    rnd = random.Random(3)
+    return {
+        "Date": "2026-01-10",
+        "Entries": [
+            {
+                "ReceivedAt": "2026-01-10T22:00:00Z",
+                "Date": "2026-01-10",
+                "Source": "pos",
+                "Payload": {
+                    "Totals": {"Gross": rnd.randrange(10 ** 6) / 100, "Orders": rnd.randrange(400)},
+                    "Lines": [{"Name": f"Pozycja {i}", "Qty": rnd.randint(1, 30)} for i in range(40)],
+                },
+            }
+            for _ in range(entries)
+        ],
+    }
+
+
+PAYLOADS = {
+    "/orders": lambda: _orders(),
+    "/orders/closed": lambda: _orders(closed=True),
+    "/reservations": lambda: _reservations(),
+    "/raports/day": lambda: _report_day(),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {"stdlib": StdlibJSONProvider(app)}
+    if orjson is not None:
+        providers["orjson"] = OrjsonProvider(app)
+    else:
+        print("orjson nie jest zainstalowany – tylko stdlib")
+
+    with app.app_context():
+        for name, build in PAYLOADS.items():
+            payload = build()
+            timings = {}
+            for provider_name, provider in providers.items():
+                size = len(provider.response(payload).get_data())
+                best = min(timeit.repeat(lambda: provider.response(payload), number=1, repeat=args.repeat))
+                timings[provider_name] = best
+                print(f"{name:<16} {provider_name:<7} {best * 1000:8.2f} ms  {size / 1024:8.1f} KiB")
+            if len(timings) > 1:
+                print(f"{'':<16} speedup {timings['stdlib'] / timings['orjson']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
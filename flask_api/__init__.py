@@ -1,14 +1,22 @@
 from flask import Flask
 
+from flask_api.compression import init_compression
 from flask_api.config import Config
 from flask_api.extensions import db
+from flask_api.json_provider import init_json
+from flask_api.pool_metrics import init_pool_metrics
 from flask_api.api import api_bp
 
 
-def create_app():
+def create_app(config: dict | None = None):
     app = Flask(__name__)
     app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+    init_json(app)
+    init_compression(app)
 
+    init_pool_metrics(app)
     db.init_app(app)
 
     # endpointy pod /api/...
@@ -1,6 +1,7 @@
-from flask import Blueprint, request
+from flask import Blueprint, jsonify, request
 
 from flask_api.auth import require_jwt
+from flask_api.request_body import PayloadError
 
 api_bp = Blueprint("api", __name__)
 
@@ -13,6 +14,11 @@ def ensure_auth_for_mutations():
         return None
     return require_jwt()
 
+
+@api_bp.errorhandler(PayloadError)
+def handle_payload_error(err: PayloadError):
+    return jsonify({"error": err.message}), err.status_code
+
 from . import staff  # noqa
 from . import login  # noqa
 from . import table_groups  # noqa
@@ -23,3 +29,5 @@ from . import settings  # noqa'
 from . import reservations
 from . import reports
 from . import stock
+from . import waiters
+from . import internal
@@ -0,0 +1,14 @@
+from flask import jsonify
+
+from flask_api.api import api_bp
+from flask_api.extensions import db
+from flask_api.pool_metrics import pool_metrics, pool_status
+
+
+@api_bp.get("/_internal/pool")
+def get_pool_stats():
+    """
+    Stan puli połączeń tego procesu (workera) + liczniki od startu:
+    wypożyczenia, czas oczekiwania na połączenie, timeouty, czas trzymania połączenia.
+    """
+    return jsonify({**pool_status(db.engine.pool), **pool_metrics.snapshot()})
@@ -1,80 +1,183 @@
-from flask import jsonify, request
+import hashlib
+
+from decimal import Decimal
+
+from flask import current_app, jsonify, request
+from sqlalchemy import insert, update
 
 from flask_api.api import api_bp
+from flask_api.cache import bump_version, get_or_build
 from flask_api.extensions import db
-from flask_api.models import Menu, Zam_Poz
+from flask_api.inventory import parse_decimal
+from flask_api.menu_search import MenuSearchIndex
+from flask_api.models import Magazyn, Menu, Receptury, Zam_Poz
+from flask_api.request_body import get_payload
 
 
-@api_bp.get("/menu")
-def get_menu():
-    items = Menu.query.all()
-    result = []
+# wersja menu – podbijana przez sync/delete i auto-tworzenie pozycji w orders.py
+MENU_CACHE = "menu"
+
+# Menu.Cena to Numeric(6, 2)
+PRICE_STEP = Decimal("0.01")
+
+
+def _build_menu() -> dict:
+    items = Menu.query.order_by(Menu.ID.asc()).all()
+    result = []
+    by_category: dict[str, list[dict]] = {}
     for m in items:
         category = m.Typ or "Inne"
-        result.append(
-            {
-                "Id": m.ID,
-                "Name": m.Nazwa,
-                "Category": category,
-                "Price": float(m.Cena),
-                "IsActive": True,
-            }
-        )
-    return jsonify(result)
+        entry = {
+            "Id": m.ID,
+            "Name": m.Nazwa,
+            "Category": category,
+            "Price": float(m.Cena),
+            "IsActive": True,
+        }
+        result.append(entry)
+        by_category.setdefault(category, []).append(entry)
+    return {"items": result, "by_category": by_category}
+
+
+def get_menu_snapshot() -> dict:
+    return get_or_build(MENU_CACHE, "menu", _build_menu)
+
+
+def get_menu_search_index() -> MenuSearchIndex:
+    return get_or_build(MENU_CACHE, "search", lambda: MenuSearchIndex(get_menu_snapshot()["items"]))
+
+
+def _serialized_menu(categories: tuple[str, ...]) -> tuple[bytes, str]:
+    """
+    Gotowe bajty odpowiedzi (+ ETag) dla całego menu albo wybranych kategorii.
+    """
+    def build():
+        # świeży snapshot (zgodny z wersją, pod którą trafi wynik); kategoria sprawdzona
+        # w get_menu mogła zniknąć, jeśli menu przebudowano w międzyczasie
+        menu = get_menu_snapshot()
+        if categories:
+            items = [it for c in categories for it in menu["by_category"].get(c, ())]
+        else:
+            items = menu["items"]
+        body = (current_app.json.dumps(items) + "\n").encode("utf-8")
+        return body, hashlib.sha1(body).hexdigest()
+
+    return get_or_build(MENU_CACHE, ("json", categories), build)
+
+
+@api_bp.get("/menu")
+def get_menu():
+    """
+    /menu
+    /menu?category=Zupy&category=Dania
+    Odpowiedź z cache (bajty), z ETag – If-None-Match daje 304.
+    """
+    categories = ()
+    requested = request.args.getlist("category")
+    if requested:
+        known = get_menu_snapshot()["by_category"]
+        categories = tuple(sorted({c for c in requested if c in known}))
+        if not categories:
+            return jsonify([])
+
+    body, etag = _serialized_menu(categories)
+
+    response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+@api_bp.get("/menu/search")
+def search_menu():
+    """
+    /menu/search?q=pier&limit=10
+    Ranking: dokładna nazwa > prefiks nazwy > prefiksy słów > kategoria > podobieństwo (literówki).
+    """
+    q = request.args.get("q", "")
+    limit = min(max(request.args.get("limit", 10, type=int), 1), 50)
+
+    results = get_menu_search_index().search(q, limit=limit)
+    return jsonify([{**item, "Score": score} for score, item in results])
 
 
 @api_bp.post("/menu/sync")
 def sync_menu():
-    data = request.get_json(silent=True) or []
+    data = get_payload([])
     if not isinstance(data, list):
         return jsonify({"error": "Expected a JSON array"}), 400
 
-    incoming_ids = set()
+    # przy powtórzonym Id wygrywa ostatni wpis
+    incoming: dict[int, dict] = {}
     for item in data:
         menu_id = item.get("Id")
-        if menu_id is not None:
-            incoming_ids.add(menu_id)
+        if menu_id is None:
+            continue
+        try:
+            price = parse_decimal(item.get("Price", 0)).quantize(PRICE_STEP)
+        except ValueError:
+            return jsonify({"error": f"Invalid Price for Id={menu_id}"}), 400
+        incoming[int(menu_id)] = {
+            "Nazwa": item.get("Name", ""),
+            "Typ": item.get("Category") or item.get("Type") or item.get("Typ"),
+            "Cena": price,
+        }
+
+    # jeden odczyt istniejących wierszy zamiast Menu.query.get per pozycja
+    existing = {
+        row.ID: row for row in
+        db.session.query(Menu.ID, Menu.Nazwa, Menu.Typ, Menu.Cena, Menu.Opis).all()
+    }
 
-    existing_ids = {row.ID for row in Menu.query.with_entities(Menu.ID).all()}
-    removed_ids = existing_ids - incoming_ids
-    if removed_ids:
-        Zam_Poz.query.filter(Zam_Poz.Menu_ID.in_(removed_ids)).delete(
+    removed_ids = sorted(set(existing) - set(incoming))
+    new_rows = []
+    changed_rows = []
+    for menu_id, values in incoming.items():
+        row = existing.get(menu_id)
+        if row is None:
+            new_rows.append({"ID": menu_id, **values, "Opis": "", "Alergeny": None})
+            continue
+
+        current = {"Nazwa": row.Nazwa, "Typ": row.Typ, "Cena": row.Cena}
+        if current != values or row.Opis is None:
+            changed = {"ID": menu_id, **values}
+            if row.Opis is None:
+                changed["Opis"] = ""
+            changed_rows.append(changed)
+
+    # najpierw nowe/zmienione pozycje (krótka transakcja)
+    if new_rows or changed_rows:
+        if new_rows:
+            db.session.execute(insert(Menu), new_rows)
+        if changed_rows:
+            db.session.execute(update(Menu), changed_rows)
+        db.session.commit()
+        bump_version(MENU_CACHE)
+
+    # usuwanie w ograniczonych paczkach, każda we własnej transakcji – kaskada po Zam_Poz
+    # nie trzyma blokad na tabelach zamówień przez cały sync. Usuwanie po ID można
+    # bezpiecznie powtórzyć: po błędzie w połowie kolejny sync usunie resztę.
+    batch_size = max(int(current_app.config.get("MENU_SYNC_DELETE_BATCH", 200)), 1)
+    for start in range(0, len(removed_ids), batch_size):
+        batch = removed_ids[start:start + batch_size]
+        Zam_Poz.query.filter(Zam_Poz.Menu_ID.in_(batch)).delete(
             synchronize_session=False
         )
-        Menu.query.filter(Menu.ID.in_(removed_ids)).delete(
+        Receptury.query.filter(Receptury.Menu_ID.in_(batch)).delete(
             synchronize_session=False
         )
+        Menu.query.filter(Menu.ID.in_(batch)).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+        bump_version(MENU_CACHE)
 
-    for item in data:
-        menu_id = item.get("Id")
-        if menu_id is None:
-            continue
-
-        name = item.get("Name", "")
-        price = item.get("Price", 0)
-        category = item.get("Category") or item.get("Type") or item.get("Typ")
-
-        menu_row = Menu.query.get(menu_id)
-        if menu_row:
-            menu_row.Nazwa = name
-            menu_row.Typ = category
-            menu_row.Cena = price
-            if menu_row.Opis is None:
-                menu_row.Opis = ""
-        else:
-            db.session.add(
-                Menu(
-                    ID=menu_id,
-                    Nazwa=name,
-                    Typ=category,
-                    Cena=price,
-                    Opis="",
-                    Alergeny=None,
-                )
-            )
-
-    db.session.commit()
-    return jsonify({"status": "ok", "count": len(data)})
+    return jsonify({
+        "status": "ok",
+        "count": len(data),
+        "inserted": len(new_rows),
+        "updated": len(changed_rows),
+        "removed": len(removed_ids),
+    })
 
 
 @api_bp.delete("/menu/<int:menu_id>")
@@ -84,6 +187,69 @@ def delete_menu_item(menu_id: int):
         return jsonify({"error": "Menu item not found"}), 404
 
     Zam_Poz.query.filter_by(Menu_ID=menu_id).delete()
+    Receptury.query.filter_by(Menu_ID=menu_id).delete()
     db.session.delete(menu_row)
     db.session.commit()
+    bump_version(MENU_CACHE)
     return jsonify({"status": "ok"})
+
+
+@api_bp.get("/menu/<int:menu_id>/recipe")
+def get_menu_recipe(menu_id: int):
+    Menu.query.get_or_404(menu_id)
+    rows = (
+        db.session.query(Receptury, Magazyn)
+        .join(Magazyn, Magazyn.ID == Receptury.Magazyn_ID)
+        .filter(Receptury.Menu_ID == menu_id)
+        .order_by(Magazyn.Nazwa.asc())
+        .all()
+    )
+    return jsonify([
+        {
+            "StockId": rec.Magazyn_ID,
+            "Name": mag.Nazwa,
+            "Unit": mag.Jednostka,
+            "Qty": float(rec.Ilosc),
+        }
+        for rec, mag in rows
+    ])
+
+
+@api_bp.put("/menu/<int:menu_id>/recipe")
+def put_menu_recipe(menu_id: int):
+    """
+    Zastępuje recepturę pozycji menu (ilości na 1 porcję).
+    Body: [ { "StockId": 3, "Qty": 0.15 }, ... ]
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        return jsonify({"error": "Expected a JSON array"}), 400
+
+    Menu.query.get_or_404(menu_id)
+
+    recipe = {}
+    for item in data:
+        try:
+            stock_id = int(item.get("StockId"))
+            qty = parse_decimal(item.get("Qty"))
+        except (TypeError, ValueError, AttributeError):
+            return jsonify({"error": f"Invalid StockId/Qty: {item}"}), 400
+        if qty <= 0:
+            return jsonify({"error": "Qty must be > 0"}), 400
+        recipe[stock_id] = qty
+
+    if recipe:
+        known = {
+            row.ID for row in
+            db.session.query(Magazyn.ID).filter(Magazyn.ID.in_(list(recipe))).all()
+        }
+        missing = sorted(set(recipe) - known)
+        if missing:
+            return jsonify({"error": "Stock item not found", "NotFound": missing}), 404
+
+    Receptury.query.filter_by(Menu_ID=menu_id).delete(synchronize_session=False)
+    for stock_id, qty in recipe.items():
+        db.session.add(Receptury(Menu_ID=menu_id, Magazyn_ID=stock_id, Ilosc=qty))
+
+    db.session.commit()
+    return jsonify({"status": "ok", "count": len(recipe)})
@@ -1,11 +1,14 @@
 from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
-
 
 from flask import jsonify, request
+from sqlalchemy import func
 
 from flask_api.api import api_bp
+from flask_api.api.menu import MENU_CACHE, get_menu_search_index
+from flask_api.api.table_groups import ZONES_CACHE
+from flask_api.cache import bump_version
 from flask_api.extensions import db
+from flask_api.inventory import DEPLETE_ON_ADD, DEPLETE_ON_SERVE, deplete_for_portions, depletion_mode
 from flask_api.models import (
     Kelnerzy,
     Menu,
@@ -15,7 +18,44 @@ from flask_api.models import (
     Zamowienia,
     Zam_Poz,
 )
-from flask_api.utils import bool_from_status, bool_from_wydane, parse_iso_datetime, renumber_tables_by_id
+from flask_api.request_body import get_payload
+from flask_api.utils import (
+    WYDANE_TRUE,
+    bool_from_status,
+    bool_from_wydane,
+    local_now,
+    parse_iso_datetime,
+    renumber_tables_by_id,
+)
+
+
+def _portions_to_deplete(old_qty: int, old_served: bool, new_qty: int, new_served: bool) -> int:
+    """
+    Ile porcji zdjąć z magazynu (ujemne = zwrot) po zmianie pozycji zamówienia,
+    zależnie od STOCK_DEPLETION_MODE.
+    """
+    mode = depletion_mode()
+    if mode == DEPLETE_ON_ADD:
+        return new_qty - old_qty
+    if mode == DEPLETE_ON_SERVE:
+        return (new_qty if new_served else 0) - (old_qty if old_served else 0)
+    return 0
+
+
+def _portions_to_return(zam: Zamowienia, items) -> dict[int, int]:
+    """
+    {Menu_ID: porcje} dla usuwanych pozycji (Menu_ID, Ilosc, Wydane) – ujemne, czyli zwrot
+    na magazyn tego, co zeszło przy dodaniu, a nie zostało zużyte.
+    Wydane porcje i zamówienia rozliczone to historia (jedzenie poszło) – bez zwrotu.
+    """
+    portions: dict[int, int] = {}
+    if bool_from_status(zam.Status):
+        return portions
+    for menu_id, qty, wydane in items:
+        if bool_from_wydane(wydane):
+            continue
+        portions[menu_id] = portions.get(menu_id, 0) + _portions_to_deplete(int(qty), False, 0, False)
+    return portions
 
 
 @api_bp.post("/orders/<int:order_id>/items")
@@ -30,10 +70,25 @@ def add_order_item(order_id: int):
     zam = Zamowienia.query.get_or_404(order_id)
 
     menu_row = Menu.query.filter_by(Nazwa=name).first()
+    menu_created = False
+    if not menu_row:
+        # "did you mean": zanim utworzymy pozycję AUTO za 0 zł, spróbuj dopasować
+        # nazwę bez wielkości liter/polskich znaków albo zwróć podpowiedzi
+        match, suggestions = get_menu_search_index().resolve(name)
+        if match:
+            menu_row = db.session.get(Menu, match["Id"])
+        elif suggestions and not data.get("CreateIfMissing"):
+            return jsonify({
+                "error": "Unknown menu item",
+                "code": "DID_YOU_MEAN",
+                "Suggestions": suggestions,
+            }), 409
+
     if not menu_row:
         menu_row = Menu(Nazwa=name, Typ="Inne", Cena=0, Opis="AUTO", Alergeny=None)
         db.session.add(menu_row)
         db.session.flush()
+        menu_created = True
 
     poz = Zam_Poz(
         Zamowienia_ID=zam.ID,
@@ -42,7 +97,14 @@ def add_order_item(order_id: int):
         Wydane="N",
     )
     db.session.add(poz)
+
+    portions = _portions_to_deplete(0, False, qty, False)
+    if portions:
+        deplete_for_portions({menu_row.ID: portions}, reason=f"Zamówienie #{zam.ID}")
+
     db.session.commit()
+    if menu_created:
+        bump_version(MENU_CACHE)
 
     return jsonify(
         {
@@ -63,6 +125,9 @@ def update_order_item(order_id: int, item_id: int):
     if not poz:
         return jsonify({"error": "Item not found"}), 404
 
+    old_qty = int(poz.Ilosc)
+    old_served = bool_from_wydane(poz.Wydane)
+
     if "Qty" in data:
         qty = int(data["Qty"])
         if qty <= 0:
@@ -72,6 +137,10 @@ def update_order_item(order_id: int, item_id: int):
     if "Served" in data:
         poz.Wydane = "Y" if bool(data["Served"]) else "N"
 
+    portions = _portions_to_deplete(old_qty, old_served, int(poz.Ilosc), bool_from_wydane(poz.Wydane))
+    if portions:
+        deplete_for_portions({poz.Menu_ID: portions}, reason=f"Zamówienie #{order_id}")
+
     db.session.commit()
     return jsonify({"status": "ok"})
 
@@ -82,6 +151,10 @@ def delete_order_item(order_id: int, item_id: int):
     if not poz:
         return jsonify({"error": "Item not found"}), 404
 
+    deplete_for_portions(
+        _portions_to_return(db.session.get(Zamowienia, order_id), [(poz.Menu_ID, poz.Ilosc, poz.Wydane)]),
+        reason=f"Zamówienie #{order_id}",
+    )
     db.session.delete(poz)
     db.session.commit()
     return jsonify({"status": "ok"})
@@ -126,7 +199,7 @@ def get_orders():
             "Items": items,
             "IsServed": is_served,
             "IsSettled": bool_from_status(zam.Status),
-            "CreatedAt": zam.Data.isoformat(),
+            "CreatedAt": zam.Data,
         }
 
         table_id = zam.Stoliki_ID
@@ -147,7 +220,7 @@ def create_order():
     if not table_id or not waiter_id or not items:
         return jsonify({"error": "Missing TableId / WaiterId / Items"}), 400
 
-    now = datetime.now(ZoneInfo("Europe/Warsaw")).replace(tzinfo=None)
+    now = local_now()
     zam = Zamowienia(
         Data=now,
         Status="open",
@@ -158,6 +231,7 @@ def create_order():
     db.session.add(zam)
     db.session.flush()
 
+    portions: dict[int, int] = {}
     for it in items:
         menu_id = it.get("MenuId")
         qty = it.get("Qty", 1)
@@ -171,6 +245,11 @@ def create_order():
                 Wydane="N",
             )
         )
+        menu_id = int(menu_id)
+        portions[menu_id] = portions.get(menu_id, 0) + _portions_to_deplete(0, False, int(qty), False)
+
+    # jeden zbiorczy UPDATE magazynu dla całego zamówienia
+    deplete_for_portions(portions, reason=f"Zamówienie #{zam.ID}")
 
     db.session.commit()
     return jsonify({"OrderId": zam.ID}), 201
@@ -185,6 +264,18 @@ def update_order_status(order_id: int):
         zam.Status = data["Status"]
 
     if data.get("SetAllServed"):
+        if depletion_mode() == DEPLETE_ON_SERVE:
+            pending = (
+                db.session.query(Zam_Poz.Menu_ID, func.sum(Zam_Poz.Ilosc))
+                .filter(Zam_Poz.Zamowienia_ID == order_id)
+                .filter(~func.upper(Zam_Poz.Wydane).in_(WYDANE_TRUE))
+                .group_by(Zam_Poz.Menu_ID)
+                .all()
+            )
+            deplete_for_portions(
+                {menu_id: int(qty) for menu_id, qty in pending},
+                reason=f"Zamówienie #{order_id}",
+            )
         Zam_Poz.query.filter_by(Zamowienia_ID=order_id).update({"Wydane": "Y"})
 
     db.session.commit()
@@ -197,6 +288,13 @@ def delete_order(order_id: int):
     if not zam:
         return jsonify({"error": "Order not found"}), 404
 
+    items = (
+        db.session.query(Zam_Poz.Menu_ID, Zam_Poz.Ilosc, Zam_Poz.Wydane)
+        .filter(Zam_Poz.Zamowienia_ID == order_id)
+        .all()
+    )
+    deplete_for_portions(_portions_to_return(zam, items), reason=f"Zamówienie #{order_id}")
+
     Zam_Poz.query.filter_by(Zamowienia_ID=order_id).delete()
     db.session.delete(zam)
     db.session.commit()
@@ -205,7 +303,7 @@ def delete_order(order_id: int):
 
 @api_bp.post("/orders/sync")
 def sync_orders():
-    data = request.get_json(silent=True) or []
+    data = get_payload([])
     if not isinstance(data, list):
         return jsonify({"error": "Expected a JSON array"}), 400
 
@@ -318,6 +416,9 @@ def sync_orders():
 
     renumber_tables_by_id()
     db.session.commit()
+    # sync może utworzyć stoliki/kelnerów dopiętych do strefy oraz pozycje menu (AUTO)
+    bump_version(ZONES_CACHE)
+    bump_version(MENU_CACHE)
     return jsonify({"status": "ok", "orders": orders_count, "positions": positions_count})
 
 
@@ -386,8 +487,8 @@ def get_closed_orders_for_day():
                     "IsServed": served,
 
                     # ⬇️ Opcjonalnie (Twoje DTO nie ma ceny, ale do raportów się przydaje)
-                    "Price": float(menu.Cena) if menu.Cena is not None else 0.0,
-                    "LineTotal": float(menu.Cena) * int(poz.Ilosc) if menu.Cena is not None else 0.0,
+                    "Price": menu.Cena if menu.Cena is not None else 0.0,
+                    "LineTotal": menu.Cena * int(poz.Ilosc) if menu.Cena is not None else 0.0,
                 }
             )
 
@@ -398,7 +499,7 @@ def get_closed_orders_for_day():
             "Items": items,
             "IsServed": is_served,
             "IsSettled": bool_from_status(zam.Status),
-            "CreatedAt": zam.Data.isoformat(),
+            "CreatedAt": zam.Data,
             # opcjonalnie:
             "Notes": zam.Uwagi,
             "WaiterId": zam.Kelnerzy_ID,
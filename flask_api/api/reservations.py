@@ -1,9 +1,15 @@
 from datetime import datetime, date, time
 from flask import jsonify, request
+from sqlalchemy import and_, case, insert, or_, update
 
 from flask_api.api import api_bp
 from flask_api.extensions import db
-from flask_api.models import Rezerwacje
+from flask_api.models import Rezerwacje, Stoliki
+from flask_api.request_body import get_payload
+from flask_api.reservation_planner import DEFAULT_STEP_MINUTES, DayPlan, format_minutes, load_policy
+from flask_api.settings_cache import parse_bool
+
+MAX_PAGE_SIZE = 500
 
 
 def _parse_date(val) -> date | None:
@@ -59,47 +65,237 @@ def _parse_time(val) -> time | None:
     return datetime.strptime(s, "%H:%M:%S").time()
 
 
+def _encode_cursor(d: date, t: time, rid: int) -> str:
+    return f"{d.isoformat()},{t.strftime('%H:%M:%S')},{rid}"
+
+
+def _decode_cursor(val: str) -> tuple[date, time, int]:
+    d, t, rid = val.split(",")
+    return date.fromisoformat(d), _parse_time(t), int(rid)
+
+
 @api_bp.get("/reservations")
 def get_reservations():
-    items = Rezerwacje.query.all()
+    """
+    Filtry (opcjonalne, bez nich – wszystkie rezerwacje jak dotąd):
+      ?from=2026-01-14&to=2026-01-16   (daty włącznie)
+      ?table=5  ?approved=1
+    Stronicowanie keyset po (Data, Godzina, Id):
+      ?limit=100  -> nagłówek X-Next-Cursor, jeśli jest dalsza strona
+      ?limit=100&after=<X-Next-Cursor>
+    """
+    args = request.args
+    try:
+        date_from = _parse_date(args.get("from"))
+        date_to = _parse_date(args.get("to"))
+        cursor = _decode_cursor(args["after"]) if args.get("after") else None
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid from/to/after"}), 400
+    limit = args.get("limit", type=int)
+    table_id = args.get("table", type=int)
+
+    q = db.session.query(
+        Rezerwacje.ID,
+        Rezerwacje.Imie,
+        Rezerwacje.Nazwisko,
+        Rezerwacje.Tel,
+        Rezerwacje.Ilosc_osob,
+        Rezerwacje.Data,
+        Rezerwacje.Godzina,
+        Rezerwacje.Zatwierdzone,
+        Rezerwacje.Stoliki_ID,
+    )
+    if date_from:
+        q = q.filter(Rezerwacje.Data >= date_from)
+    if date_to:
+        q = q.filter(Rezerwacje.Data <= date_to)
+    if table_id is not None:
+        q = q.filter(Rezerwacje.Stoliki_ID == table_id)
+    if args.get("approved"):
+        q = q.filter(Rezerwacje.Zatwierdzone == parse_bool(args["approved"]))
+    if cursor:
+        d, t, rid = cursor
+        # rozpisane zamiast (Data, Godzina, ID) > (...) – MySQL lepiej używa wtedy indeksu
+        q = q.filter(or_(
+            Rezerwacje.Data > d,
+            and_(Rezerwacje.Data == d, Rezerwacje.Godzina > t),
+            and_(Rezerwacje.Data == d, Rezerwacje.Godzina == t, Rezerwacje.ID > rid),
+        ))
 
-    result = []
-    for r in items:
-        # Składamy “StartTime” na potrzeby UI z Data + Godzina
-        start_dt = None
-        if r.Data and r.Godzina:
-            start_dt = datetime.combine(r.Data, r.Godzina)
+    q = q.order_by(Rezerwacje.Data, Rezerwacje.Godzina, Rezerwacje.ID)
+    if limit is not None:
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+        q = q.limit(limit + 1)
+    rows = q.all()
 
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(last.Data, last.Godzina, last.ID)
+
+    result = []
+    for r in rows:
         result.append({
             "Id": r.ID,
             "FirstName": r.Imie,
             "LastName": r.Nazwisko,
             "Phone": r.Tel,
             "PeopleCount": r.Ilosc_osob,
-            "Date": r.Data.isoformat() if r.Data else None,
-            "Time": r.Godzina.strftime("%H:%M:%S") if r.Godzina else None,
-            "StartTime": start_dt.isoformat() if start_dt else None,
+            "Date": r.Data,
+            "Time": r.Godzina,
+            # “StartTime” na potrzeby UI z Data + Godzina
+            "StartTime": f"{r.Data}T{r.Godzina}",
             "Approved": bool(r.Zatwierdzone),
             "TableId": r.Stoliki_ID
         })
 
-    return jsonify(result)
+    response = jsonify(result)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
+def _day_plan(day: date) -> DayPlan:
+    """
+    Stoliki + rezerwacje z przypisanym stolikiem na dany dzień (dwa zapytania).
+    """
+    tables = db.session.query(Stoliki.ID, Stoliki.Ile_osob).all()
+    reservations = (
+        db.session.query(Rezerwacje.Stoliki_ID, Rezerwacje.Godzina)
+        .filter(Rezerwacje.Data == day)
+        .filter(Rezerwacje.Stoliki_ID.isnot(None))
+        .all()
+    )
+    return DayPlan(tables, reservations, *load_policy())
+
+
+@api_bp.get("/reservations/availability")
+def get_reservation_availability():
+    """
+    /reservations/availability?date=2026-01-14&people=4&step=15
+    Wolne godziny rozpoczęcia per stolik (Ile_osob >= people), z uwzględnieniem
+    istniejących rezerwacji, odstępu między rezerwacjami i godzin otwarcia.
+    """
+    try:
+        day = _parse_date(request.args.get("date"))
+    except ValueError:
+        day = None
+    if day is None:
+        return jsonify({"error": "Missing or invalid date"}), 400
+
+    people = request.args.get("people", 1, type=int)
+    step = request.args.get("step", DEFAULT_STEP_MINUTES, type=int)
+    if people <= 0 or not 5 <= step <= 240:
+        return jsonify({"error": "Invalid people or step"}), 400
+
+    plan = _day_plan(day)
+    return jsonify({
+        "Date": day.isoformat(),
+        "People": people,
+        "IntervalMinutes": plan.interval,
+        "OpenFrom": format_minutes(plan.open_min),
+        "CloseTo": format_minutes(plan.close_min),
+        "Tables": [
+            {
+                "TableId": schedule.table_id,
+                "Seats": schedule.seats,
+                "Slots": [format_minutes(s) for s in slots],
+            }
+            for schedule, slots in plan.available(people, step)
+        ],
+    })
+
+
+@api_bp.post("/reservations/assign")
+def assign_reservation_tables():
+    """
+    /reservations/assign?date=2026-01-14
+    Przydziela stoliki wszystkim rezerwacjom dnia bez Stoliki_ID:
+    najpierw największe grupy (najtrudniej je zmieścić), potem wg godziny;
+    każda dostaje najmniejszy wolny stolik z wystarczającą liczbą miejsc
+    (z zachowaniem odstępu między rezerwacjami).
+    Wynik zapisywany jednym UPDATE ... CASE; rezerwacje przydzielone (albo usunięte)
+    w międzyczasie przez kogoś innego trafiają do Skipped.
+    """
+    try:
+        day = _parse_date(request.args.get("date"))
+    except ValueError:
+        day = None
+    if day is None:
+        return jsonify({"error": "Missing or invalid date"}), 400
+
+    plan = _day_plan(day)
+    pending = (
+        db.session.query(Rezerwacje.ID, Rezerwacje.Ilosc_osob, Rezerwacje.Godzina)
+        .filter(Rezerwacje.Data == day)
+        .filter(Rezerwacje.Stoliki_ID.is_(None))
+        .all()
+    )
+
+    assignments: dict[int, int] = {}
+    unassigned: list[int] = []
+    for rid, people, start in sorted(pending, key=lambda r: (-(r.Ilosc_osob or 0), r.Godzina, r.ID)):
+        minute = plan.minute_of(start)
+        schedule = plan.best_table(people or 1, minute)
+        if schedule is None:
+            unassigned.append(rid)
+            continue
+        schedule.book(minute)
+        assignments[rid] = schedule.table_id
+
+    skipped: list[int] = []
+    if assignments:
+        # Stoliki_ID IS NULL – nie nadpisujemy przydziałów zrobionych w międzyczasie ręcznie
+        (Rezerwacje.query
+         .filter(Rezerwacje.ID.in_(list(assignments)))
+         .filter(Rezerwacje.Stoliki_ID.is_(None))
+         .update(
+             {Rezerwacje.Stoliki_ID: case(assignments, value=Rezerwacje.ID)},
+             synchronize_session=False,
+         ))
+        # odczyt w tej samej transakcji: które wiersze faktycznie mają nasz stolik
+        current = dict(
+            db.session.query(Rezerwacje.ID, Rezerwacje.Stoliki_ID)
+            .filter(Rezerwacje.ID.in_(list(assignments)))
+            .all()
+        )
+        skipped = [rid for rid, table_id in assignments.items() if current.get(rid) != table_id]
+        for rid in skipped:
+            del assignments[rid]
+        db.session.commit()
+
+    return jsonify({
+        "status": "ok",
+        "Date": day.isoformat(),
+        "Assigned": [{"Id": rid, "TableId": table_id} for rid, table_id in sorted(assignments.items())],
+        "Unassigned": sorted(unassigned),
+        "Skipped": sorted(skipped),
+    })
 
 
 @api_bp.post("/reservations/sync")
 def sync_reservations():
     """
-    Tak samo jak w menu.py: przyjmujemy listę i nadpisujemy tabelę.
+    Tak samo jak w menu.py: lista jest pełnym stanem, ale zapisujemy tylko różnice
+    (po Id): nowe -> INSERT, zmienione -> UPDATE, brakujące -> DELETE.
     JSON: [{ Id, FirstName, LastName, Phone, PeopleCount, Date, Time, Approved, TableId }, ...]
+
+    Opcjonalne okno ?from=2026-01-14&to=2026-01-20: lista jest pełnym stanem
+    tylko tych dni – rezerwacje spoza okna, których nie ma w liście, zostają.
     """
-    data = request.get_json(silent=True) or []
+    data = get_payload([])
     if not isinstance(data, list):
         return jsonify({"error": "Expected a JSON array"}), 400
 
-    Rezerwacje.query.delete()
-    db.session.flush()
+    try:
+        date_from = _parse_date(request.args.get("from"))
+        date_to = _parse_date(request.args.get("to"))
+    except ValueError:
+        return jsonify({"error": "Invalid from/to"}), 400
 
-    count = 0
+    # przy powtórzonym Id wygrywa ostatni wpis
+    incoming: dict[int, dict] = {}
     for item in data:
         rid = item.get("Id")
         if rid is None:
@@ -130,21 +326,69 @@ def sync_reservations():
         if d is None or t is None:
             continue
 
-        db.session.add(Rezerwacje(
-            ID=rid,
-            Imie=imie,
-            Nazwisko=nazwisko,
-            Tel=item.get("Phone"),
-            Ilosc_osob=int(item.get("PeopleCount") or 0),
-            Data=d,
-            Godzina=t,
-            Zatwierdzone=bool(item.get("Approved")),
-            Stoliki_ID=item.get("TableId")
-        ))
-        count += 1
+        table_id = item.get("TableId")
+        incoming[int(rid)] = {
+            "Imie": imie,
+            "Nazwisko": nazwisko,
+            "Tel": item.get("Phone"),
+            "Ilosc_osob": int(item.get("PeopleCount") or 0),
+            "Data": d,
+            "Godzina": t,
+            "Zatwierdzone": bool(item.get("Approved")),
+            "Stoliki_ID": int(table_id) if table_id not in (None, "") else None,
+        }
+
+    # jeden odczyt: wiersze z okna (kandydaci do usunięcia) + wiersze z listy
+    q = db.session.query(
+        Rezerwacje.ID,
+        Rezerwacje.Imie,
+        Rezerwacje.Nazwisko,
+        Rezerwacje.Tel,
+        Rezerwacje.Ilosc_osob,
+        Rezerwacje.Data,
+        Rezerwacje.Godzina,
+        Rezerwacje.Zatwierdzone,
+        Rezerwacje.Stoliki_ID,
+    )
+    if date_from or date_to:
+        window = []
+        if date_from:
+            window.append(Rezerwacje.Data >= date_from)
+        if date_to:
+            window.append(Rezerwacje.Data <= date_to)
+        q = q.filter(or_(and_(*window), Rezerwacje.ID.in_(list(incoming))))
+    existing = {row.ID: row for row in q.all()}
+
+    in_window = [
+        rid for rid, row in existing.items()
+        if (date_from is None or row.Data >= date_from) and (date_to is None or row.Data <= date_to)
+    ]
+    removed_ids = sorted(set(in_window) - set(incoming))
+
+    new_rows = []
+    changed_rows = []
+    for rid, values in incoming.items():
+        row = existing.get(rid)
+        if row is None:
+            new_rows.append({"ID": rid, **values})
+        elif any(getattr(row, name) != value for name, value in values.items()):
+            changed_rows.append({"ID": rid, **values})
+
+    if removed_ids:
+        Rezerwacje.query.filter(Rezerwacje.ID.in_(removed_ids)).delete(synchronize_session=False)
+    if new_rows:
+        db.session.execute(insert(Rezerwacje), new_rows)
+    if changed_rows:
+        db.session.execute(update(Rezerwacje), changed_rows)
 
     db.session.commit()
-    return jsonify({"status": "ok", "count": count})
+    return jsonify({
+        "status": "ok",
+        "count": len(incoming),
+        "inserted": len(new_rows),
+        "updated": len(changed_rows),
+        "removed": len(removed_ids),
+    })
 
 
 @api_bp.patch("/reservations/<int:rid>/approved")
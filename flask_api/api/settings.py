@@ -1,27 +1,38 @@
 import os
 from flask import jsonify, request
+from sqlalchemy import Integer, String, cast
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 
 from flask_api.api import api_bp
 from flask_api.extensions import db
 from flask_api.models import Ustawienia
+from flask_api.settings_cache import (
+    CLOSE_TO,
+    OPEN_FROM,
+    REQUIRE_APPROVAL,
+    RESERVATION_INTERVAL,
+    RESERVATION_KEYS,
+    SETTINGS_VERSION_KEY,
+    get_settings,
+    invalidate_settings,
+)
 
 
 def _get(name: str) -> Ustawienia | None:
     return Ustawienia.query.filter_by(Nazwa_opcji=name).first()
 
 
-def _get_value(name: str, default: str | None = None) -> str | None:
-    row = _get(name)
-    if not row:
-        return default
-    return row.Wartosc
-
-
-def _set_value(name: str, value: str, typ: str | None = None, opis: str | None = None):
-    row = _get(name)
+def _set_value(name: str, value: str, typ: str | None = None, opis: str | None = None,
+               rows: dict[str, Ustawienia] | None = None):
+    """
+    rows: wczytane wcześniej wiersze (Nazwa_opcji -> Ustawienia), żeby nie robić SELECT per klucz.
+    """
+    row = rows.get(name) if rows is not None else _get(name)
     if not row:
         row = Ustawienia(Nazwa_opcji=name, Wartosc=str(value), Typ=typ, Opis=opis)
         db.session.add(row)
+        if rows is not None:
+            rows[name] = row
     else:
         row.Wartosc = str(value)
         if typ is not None:
@@ -30,46 +41,94 @@ def _set_value(name: str, value: str, typ: str | None = None, opis: str | None =
             row.Opis = opis
 
 
-def _to_bool(v: str | None) -> bool:
-    if v is None:
-        return False
-    return str(v).strip().lower() in ("1", "true", "yes", "y", "tak")
+def _upsert_statement(rows: list[dict], on_conflict):
+    """
+    INSERT ... ON DUPLICATE KEY UPDATE (MySQL) / ON CONFLICT (Nazwa_opcji) DO UPDATE
+    (SQLite, PostgreSQL); None dla innych baz.
+    on_conflict(nowy_wiersz) -> wyrażenie dla Wartosc istniejącego wiersza.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("mysql", "mariadb"):
+        stmt = mysql.insert(Ustawienia).values(rows)
+        return stmt.on_duplicate_key_update(Wartosc=on_conflict(stmt.inserted))
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert(Ustawienia).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[Ustawienia.Nazwa_opcji],
+            set_={"Wartosc": on_conflict(stmt.excluded)},
+        )
+    return None
+
+
+def _upsert_values(values: dict[str, str]) -> None:
+    """
+    Wszystkie klucze jednym wielowierszowym upsertem.
+    Typ i Opis istniejących wierszy zostają bez zmian.
+    """
+    rows = [{"Nazwa_opcji": k, "Wartosc": v} for k, v in values.items()]
+    if not rows:
+        return
+
+    stmt = _upsert_statement(rows, lambda new: new.Wartosc)
+    if stmt is not None:
+        db.session.execute(stmt)
+        return
+
+    existing = {
+        s.Nazwa_opcji: s
+        for s in Ustawienia.query.filter(Ustawienia.Nazwa_opcji.in_(list(values))).all()
+    }
+    for k, v in values.items():
+        _set_value(k, v, rows=existing)
+
 
+def _bump_settings_version() -> int:
+    """
+    Podbija wersję ustawień zapisaną w bazie (wiersz SETTINGS_VERSION_KEY) w bieżącej
+    transakcji – commit razem ze zmianami. Wersja jest wspólna dla wszystkich workerów.
+    """
+    stmt = _upsert_statement(
+        [{"Nazwa_opcji": SETTINGS_VERSION_KEY, "Wartosc": "1", "Typ": "int",
+          "Opis": "Wersja ustawień (podbijana przy każdej zmianie)"}],
+        lambda new: cast(cast(Ustawienia.Wartosc, Integer) + 1, String(255)),
+    )
+    if stmt is not None:
+        db.session.execute(stmt)
+    else:
+        row = Ustawienia.query.filter_by(Nazwa_opcji=SETTINGS_VERSION_KEY).with_for_update().first()
+        if row is None:
+            _set_value(SETTINGS_VERSION_KEY, "1", typ="int")
+        else:
+            row.Wartosc = str(int(row.Wartosc) + 1)
+        db.session.flush()
 
-def _to_int(v: str | None, default: int = 0) -> int:
-    try:
-        return int(str(v).strip())
-    except:
-        return default
+    return int(
+        db.session.query(Ustawienia.Wartosc)
+        .filter(Ustawienia.Nazwa_opcji == SETTINGS_VERSION_KEY)
+        .scalar()
+    )
 
 
 # ---------- PUBLIC API ----------
 
 @api_bp.get("/settings")
 def get_settings_all():
-    items = Ustawienia.query.order_by(Ustawienia.ID).all()
-    return jsonify([
-        {
-            "Id": s.ID,
-            "Name": s.Nazwa_opcji,
-            "Value": s.Wartosc,
-            "Type": s.Typ,
-            "Description": s.Opis
-        } for s in items
-    ])
+    return jsonify(get_settings().entries)
 
 
 @api_bp.get("/settings/reservations")
 def get_reservation_settings():
     """
     Zwraca ustawienia rezerwacji w formie wygodnej dla UI.
-    Źródłem jest tabela Ustawienia (key/value).
+    Źródłem jest tabela Ustawienia (key/value), czytana z cache ustawień.
     """
+    settings = get_settings()
     return jsonify({
-        "RequireApproval": _to_bool(_get_value("Zatwierdzanie_Rezerwacji", "0")),
-        "ReservationIntervalMinutes": _to_int(_get_value("Odstep_miedzy_rezerwacjami", "0"), 0),
-        "OpenFrom": _get_value("godziny_otwarcia_od", ""),
-        "CloseTo": _get_value("godziny_zamkniecia_od", ""),
+        "RequireApproval": settings.get_bool(REQUIRE_APPROVAL, False),
+        "ReservationIntervalMinutes": settings.get_int(RESERVATION_INTERVAL, 0),
+        "OpenFrom": settings.raw(OPEN_FROM, ""),
+        "CloseTo": settings.raw(CLOSE_TO, ""),
     })
 
 
@@ -86,24 +145,32 @@ def put_reservation_settings():
     """
     payload = request.get_json(silent=True) or {}
 
+    # wszystkie 4 wiersze jednym zapytaniem
+    rows = {
+        s.Nazwa_opcji: s
+        for s in Ustawienia.query.filter(Ustawienia.Nazwa_opcji.in_(RESERVATION_KEYS)).all()
+    }
+
     if "RequireApproval" in payload:
-        _set_value("Zatwierdzanie_Rezerwacji", "1" if bool(payload["RequireApproval"]) else "0", typ="bool",
-                   opis="0 - nie potrzeba, 1 - potrzeba")
+        _set_value(REQUIRE_APPROVAL, "1" if bool(payload["RequireApproval"]) else "0", typ="bool",
+                   opis="0 - nie potrzeba, 1 - potrzeba", rows=rows)
 
     if "ReservationIntervalMinutes" in payload:
-        _set_value("Odstep_miedzy_rezerwacjami", str(int(payload["ReservationIntervalMinutes"])), typ="int",
-                   opis="Odstęp między rezerwacjami w minutach")
+        _set_value(RESERVATION_INTERVAL, str(int(payload["ReservationIntervalMinutes"])), typ="int",
+                   opis="Odstęp między rezerwacjami w minutach", rows=rows)
 
     if "OpenFrom" in payload:
-        _set_value("godziny_otwarcia_od", str(payload["OpenFrom"]).strip(), typ="time",
-                   opis="Godzina otwarcia (HH:MM)")
+        _set_value(OPEN_FROM, str(payload["OpenFrom"]).strip(), typ="time",
+                   opis="Godzina otwarcia (HH:MM)", rows=rows)
 
     if "CloseTo" in payload:
-        _set_value("godziny_zamkniecia_od", str(payload["CloseTo"]).strip(), typ="time",
-                   opis="Godzina zamknięcia (HH:MM)")
+        _set_value(CLOSE_TO, str(payload["CloseTo"]).strip(), typ="time",
+                   opis="Godzina zamknięcia (HH:MM)", rows=rows)
 
+    version = _bump_settings_version()
     db.session.commit()
-    return jsonify({"status": "ok"})
+    invalidate_settings(version)
+    return jsonify({"status": "ok", "version": version})
 
 
 @api_bp.patch("/settings/bulk")
@@ -121,11 +188,18 @@ def patch_settings_bulk():
     if not isinstance(payload, dict):
         return jsonify({"error": "Expected JSON object"}), 400
 
-    for k, v in payload.items():
-        _set_value(k, str(v))
+    values = {str(k).strip(): str(v) for k, v in payload.items()}
+    if any(not k for k in values):
+        return jsonify({"error": "Empty setting name"}), 400
+    if SETTINGS_VERSION_KEY in values:
+        return jsonify({"error": f"{SETTINGS_VERSION_KEY} is reserved"}), 400
 
+    _upsert_values(values)
+    version = _bump_settings_version()
     db.session.commit()
-    return jsonify({"status": "ok"})
+    invalidate_settings(version)
+    # wersja z bazy: każdy worker przeładuje ustawienia najpóźniej po SETTINGS_REVALIDATE_SECONDS
+    return jsonify({"status": "ok", "count": len(values), "version": version})
 
 
 @api_bp.get("/settings/admin")
@@ -1,8 +1,12 @@
 from flask import jsonify, request
+from sqlalchemy import insert, update
 
 from flask_api.api import api_bp
+from flask_api.api.table_groups import ZONES_CACHE
+from flask_api.cache import bump_version
 from flask_api.extensions import db
 from flask_api.models import Pracownicy, Logowanie, Kelnerzy, Zamowienia
+from flask_api.request_body import get_payload
 
 
 @api_bp.get("/staff")
@@ -60,6 +64,8 @@ def create_staff():
     )
     db.session.add(log)
     db.session.commit()
+    # AssignedStaffIds w /table-groups i indeks kelner <-> stolik zależą od personelu
+    bump_version(ZONES_CACHE)
 
     return jsonify({"Id": prac.ID}), 201
 
@@ -109,70 +115,109 @@ def delete_staff(staff_id: int):
 
     db.session.delete(prac)
     db.session.commit()
+    bump_version(ZONES_CACHE)
     return jsonify({"status": "ok"})
 
 
 @api_bp.post("/staff/sync")
 def sync_staff():
-    data = request.get_json(silent=True) or []
+    data = get_payload([])
     if not isinstance(data, list):
         return jsonify({"error": "Expected a JSON array"}), 400
 
-    seen_ids = set()
-    count_new = 0
-    count_updated = 0
-
+    # przy powtórzonym Id wygrywa ostatni wpis (jak przy zapisie po kolei)
+    incoming: dict[int, dict] = {}
     for item in data:
         staff_id = item.get("Id")
         if staff_id is None:
             continue
+        incoming[int(staff_id)] = item
+
+    count_new = 0
+    count_updated = 0
+    count_unchanged = 0
+
+    if incoming:
+        # 2 zapytania zamiast 2 na osobę
+        workers = {
+            row.ID: row for row in
+            db.session.query(Pracownicy.ID, Pracownicy.Imie, Pracownicy.Nazwisko, Pracownicy.Tel)
+            .filter(Pracownicy.ID.in_(list(incoming)))
+            .all()
+        }
+        logins = {
+            row.Pracownicy_ID: row for row in
+            db.session.query(Logowanie.ID, Logowanie.Pracownicy_ID, Logowanie.Login, Logowanie.Haslo)
+            .filter(Logowanie.Pracownicy_ID.in_(list(incoming)))
+            .all()
+        }
 
-        seen_ids.add(staff_id)
-
-        first = item.get("FirstName", "")
-        last = item.get("LastName", "")
-        phone = item.get("Phone", "")
-        login = item.get("Login", "")
-        pwd_hash = item.get("PasswordHash", "")
-
-        prac = Pracownicy.query.get(staff_id)
-        if not prac:
-            prac = Pracownicy(
-                ID=staff_id,
-                Numer_prac=staff_id,
-                Nazwisko=last,
-                Imie=first,
-                Tel=phone,
-            )
-            db.session.add(prac)
-            count_new += 1
-        else:
-            prac.Nazwisko = last
-            prac.Imie = first
-            prac.Tel = phone
-            count_updated += 1
-
-        log = Logowanie.query.filter_by(Pracownicy_ID=prac.ID).first()
-        if not log:
-            log = Logowanie(
-                Pracownicy_ID=prac.ID,
-                Login=login,
-                Haslo=pwd_hash,
-                Sol="",
-            )
-            db.session.add(log)
-        else:
-            log.Login = login
-            log.Haslo = pwd_hash
+        new_workers, changed_workers = [], []
+        new_logins, changed_logins = [], []
+
+        for staff_id, item in incoming.items():
+            first = item.get("FirstName", "")
+            last = item.get("LastName", "")
+            phone = item.get("Phone", "")
+            login = item.get("Login", "")
+            pwd_hash = item.get("PasswordHash", "")
+
+            changed = False
+
+            prac = workers.get(staff_id)
+            if prac is None:
+                new_workers.append({
+                    "ID": staff_id,
+                    "Numer_prac": staff_id,
+                    "Nazwisko": last,
+                    "Imie": first,
+                    "Tel": phone,
+                })
+            elif (prac.Imie, prac.Nazwisko, prac.Tel) != (first, last, phone):
+                changed_workers.append({"ID": staff_id, "Nazwisko": last, "Imie": first, "Tel": phone})
+                changed = True
+
+            log = logins.get(staff_id)
+            if log is None:
+                new_logins.append({
+                    "Pracownicy_ID": staff_id,
+                    "Login": login,
+                    "Haslo": pwd_hash,
+                    "Sol": "",
+                })
+                changed = True
+            elif (log.Login, log.Haslo) != (login, pwd_hash):
+                changed_logins.append({"ID": log.ID, "Login": login, "Haslo": pwd_hash})
+                changed = True
+
+            if prac is None:
+                count_new += 1
+            elif changed:
+                count_updated += 1
+            else:
+                count_unchanged += 1
+
+        # hurtem; Pracownicy przed Logowanie (klucz obcy)
+        if new_workers:
+            db.session.execute(insert(Pracownicy), new_workers)
+        if changed_workers:
+            db.session.execute(update(Pracownicy), changed_workers)
+        if new_logins:
+            db.session.execute(insert(Logowanie), new_logins)
+        if changed_logins:
+            db.session.execute(update(Logowanie), changed_logins)
 
     db.session.commit()
+    if count_new or count_updated:
+        bump_version(ZONES_CACHE)
 
     return jsonify(
         {
             "status": "ok",
             "new": count_new,
             "updated": count_updated,
-            "total_from_json": len(seen_ids),
+            "unchanged": count_unchanged,
+            "total_from_json": len(incoming),
         }
     )
 
@@ -1,22 +1,156 @@
-from flask import jsonify, request
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask import Response, current_app, jsonify, request, stream_with_context
 
 from flask_api.api import api_bp
+from flask_api.events import stock_events
 from flask_api.extensions import db
+from flask_api.inventory import (
+    apply_stock_deltas,
+    consumption_between,
+    is_low_stock,
+    last_stock_event_id,
+    low_stock_event,
+    parse_decimal,
+    record_movements,
+    stock_at,
+    stock_events_after,
+    take_snapshot,
+)
 from flask_api.models import Magazyn
+from flask_api.utils import local_now
+
+
+def _parse_moment(value: str | None, default: datetime | None = None) -> datetime:
+    """
+    "YYYY-MM-DD" albo ISO datetime (czas lokalny). Rzuca ValueError.
+    """
+    if not value:
+        if default is None:
+            raise ValueError("Missing date")
+        return default
+    s = value.strip().replace(" ", "T")
+    if len(s) == 10:
+        return datetime.strptime(s, "%Y-%m-%d")
+    return datetime.fromisoformat(s)
+
+
+def _parse_threshold(value) -> Decimal | None:
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    threshold = parse_decimal(value)
+    if threshold < 0:
+        raise ValueError("Threshold must be >= 0")
+    return threshold
+
+
+def _refresh_low_flag(row: Magazyn) -> dict[int, tuple[str, Decimal]]:
+    """
+    Ustawia Niski_stan; zwraca przekroczenie progu w formacie `crossings` dla record_movements.
+    """
+    is_low = is_low_stock(row.Ilosc, row.Prog_minimalny)
+    if is_low == bool(row.Niski_stan):
+        return {}
+    row.Niski_stan = is_low
+    return {row.ID: (low_stock_event(is_low), Decimal(row.Ilosc))}
+
+
+def _stock_json(x: Magazyn) -> dict:
+    return {
+        "Id": x.ID,
+        "Name": x.Nazwa,
+        "Unit": x.Jednostka,
+        "Qty": float(x.Ilosc),
+        "Threshold": float(x.Prog_minimalny) if x.Prog_minimalny is not None else None,
+        "IsLow": bool(x.Niski_stan),
+    }
 
 
 @api_bp.get("/stock")
 def get_stock():
     items = Magazyn.query.order_by(Magazyn.Nazwa.asc()).all()
-    return jsonify([
-        {
-            "Id": x.ID,
-            "Name": x.Nazwa,
-            "Unit": x.Jednostka,
-            "Qty": float(x.Ilosc),
-        }
-        for x in items
-    ])
+    return jsonify([_stock_json(x) for x in items])
+
+
+@api_bp.get("/stock/low")
+def get_low_stock():
+    """
+    Pozycje poniżej progu – filtr po zindeksowanej fladze Niski_stan.
+    """
+    items = (
+        Magazyn.query
+        .filter(Magazyn.Niski_stan.is_(True))
+        .order_by(Magazyn.Nazwa.asc())
+        .all()
+    )
+    return jsonify([_stock_json(x) for x in items])
+
+
+@api_bp.get("/stock/events")
+def get_stock_events():
+    """
+    Zdarzenia przekroczenia progów (StockLow / StockRecovered) z dziennika Magazyn_Ruchy.
+    Id zdarzenia = ID wiersza dziennika, więc kursor działa niezależnie od workera.
+    - domyślnie strumień SSE (text/event-stream), wznawiany przez Last-Event-ID
+    - ?format=json – jednorazowa lista zdarzeń nowszych niż ?since=<Id>
+
+    Strumień odpytuje bazę co STOCK_EVENTS_POLL_SECONDS (zmiany z tego workera budzą go
+    od razu) i kończy się po STOCK_EVENTS_MAX_STREAM_SECONDS – EventSource łączy się
+    ponownie z Last-Event-ID, a wątek workera nie jest zajęty na zawsze.
+
+    Zdarzenia wychodzą z opóźnieniem STOCK_EVENTS_COMMIT_LAG_SECONDS: kursor po ID
+    przesuwamy dopiero, gdy transakcje z niższymi ID zdążyły się zakończyć.
+    """
+    config = current_app.config
+    keepalive = float(config.get("STOCK_EVENTS_KEEPALIVE_SECONDS", 15))
+    poll = float(config.get("STOCK_EVENTS_POLL_SECONDS", 2))
+    lifetime = float(config.get("STOCK_EVENTS_MAX_STREAM_SECONDS", 300))
+    commit_lag = timedelta(seconds=float(config.get("STOCK_EVENTS_COMMIT_LAG_SECONDS", 5)))
+
+    last_id = request.headers.get("Last-Event-ID", type=int)
+    if last_id is None:
+        last_id = request.args.get("since", type=int)
+    if last_id is None:
+        last_id = last_stock_event_id(local_now() - commit_lag)
+
+    if request.args.get("format") == "json":
+        events = stock_events_after(last_id, settled_before=local_now() - commit_lag)
+        return jsonify({"LastId": events[-1]["Id"] if events else last_id, "Events": events})
+
+    def generate(last_seen: int):
+        started = last_write = time.monotonic()
+        # "id:" bez danych ustawia Last-Event-ID klienta – ponowne połączenie nie zgubi zdarzeń
+        yield f"retry: {int(poll * 1000)}\nid: {last_seen}\n\n"
+        wake_id = stock_events.last_id
+
+        while True:
+            events = stock_events_after(last_seen, settled_before=local_now() - commit_lag)
+            # koniec transakcji odczytu: połączenie wraca do puli, kolejny odczyt widzi nowe commity
+            db.session.rollback()
+            for ev in events:
+                last_seen = ev["Id"]
+                last_write = time.monotonic()
+                yield f"id: {ev['Id']}\nevent: {ev['Type']}\ndata: {current_app.json.dumps(ev['Data'])}\n\n"
+
+            now = time.monotonic()
+            if now - started >= lifetime:
+                yield f"id: {last_seen}\n\n"
+                return
+            if now - last_write >= keepalive:
+                last_write = now
+                yield ": keep-alive\n\n"
+
+            # lokalne "wake" nie skraca marginesu na commit – zdarzenie i tak wyjdzie po nim
+            stock_events.wait(wake_id, timeout=min(poll, max(lifetime - (now - started), 0)))
+            wake_id = stock_events.last_id
+
+    return Response(
+        stream_with_context(generate(last_id)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @api_bp.post("/stock")
@@ -29,12 +163,19 @@ def create_stock_item():
         return jsonify({"error": "Missing Name or Unit"}), 400
 
     try:
-        qty = float(data.get("Qty", 0))
-    except Exception:
+        qty = parse_decimal(data.get("Qty", 0))
+    except ValueError:
         return jsonify({"error": "Invalid Qty"}), 400
 
-    row = Magazyn(Nazwa=name, Jednostka=unit, Ilosc=qty)
+    try:
+        threshold = _parse_threshold(data.get("Threshold"))
+    except ValueError:
+        return jsonify({"error": "Invalid Threshold"}), 400
+
+    row = Magazyn(Nazwa=name, Jednostka=unit, Ilosc=qty, Prog_minimalny=threshold, Niski_stan=False)
     db.session.add(row)
+    db.session.flush()
+    record_movements({row.ID: qty}, reason="Stan początkowy", source="create", crossings=_refresh_low_flag(row))
     db.session.commit()
     return jsonify({"Id": row.ID}), 201
 
@@ -42,7 +183,9 @@ def create_stock_item():
 @api_bp.patch("/stock/<int:item_id>")
 def patch_stock_item(item_id: int):
     data = request.get_json(silent=True) or {}
-    row = Magazyn.query.get_or_404(item_id)
+    # blokada wiersza do commit: delta do dziennika liczona od aktualnej ilości,
+    # równoległe /adjust czeka, zamiast zginąć w różnicy
+    row = Magazyn.query.filter_by(ID=item_id).with_for_update().first_or_404()
 
     if "Name" in data:
         row.Nazwa = (data.get("Name") or "").strip()
@@ -52,10 +195,27 @@ def patch_stock_item(item_id: int):
 
     if "Qty" in data:
         try:
-            row.Ilosc = float(data.get("Qty"))
-        except Exception:
+            qty = parse_decimal(data.get("Qty"))
+        except ValueError:
             return jsonify({"error": "Invalid Qty"}), 400
+        delta = qty - Decimal(row.Ilosc)
+        row.Ilosc = qty
+    else:
+        delta = Decimal(0)
 
+    if "Threshold" in data:
+        try:
+            row.Prog_minimalny = _parse_threshold(data.get("Threshold"))
+        except ValueError:
+            return jsonify({"error": "Invalid Threshold"}), 400
+
+    crossings = _refresh_low_flag(row)
+    record_movements(
+        {row.ID: delta},
+        reason="Korekta stanu" if delta else "Zmiana progu",
+        source="patch" if delta else "threshold",
+        crossings=crossings,
+    )
     db.session.commit()
     return jsonify({"status": "ok"})
 
@@ -66,14 +226,141 @@ def adjust_stock(item_id: int):
     Body: { "Delta": -2.0, "Reason": "Zużycie" }
     """
     data = request.get_json(silent=True) or {}
-    row = Magazyn.query.get_or_404(item_id)
 
     try:
-        delta = float(data.get("Delta", 0))
-    except Exception:
+        delta = parse_decimal(data.get("Delta", 0))
+    except ValueError:
         return jsonify({"error": "Invalid Delta"}), 400
 
-    row.Ilosc = float(row.Ilosc) + delta
+    new_qty = apply_stock_deltas({item_id: delta}, reason=data.get("Reason"), source="adjust").get(item_id)
+    if new_qty is None:
+        db.session.rollback()
+        return jsonify({"error": "Stock item not found"}), 404
+
+    db.session.commit()
+
+    return jsonify({"status": "ok", "NewQty": float(new_qty)})
+
+
+@api_bp.post("/stock/adjust")
+def adjust_stock_bulk():
+    """
+    Wiele korekt w jednym UPDATE (wszystko albo nic).
+    Body: [ { "Id": 1, "Delta": -2.0 }, { "Id": 5, "Delta": 0.25 }, ... ]
+      albo { "Items": [ ... ], "Reason": "Inwentaryzacja" }
+    Powtórzone Id są sumowane.
+    """
+    data = request.get_json(silent=True)
+    items = data.get("Items") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return jsonify({"error": "Expected a JSON array"}), 400
+
+    deltas = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or item.get("Id") is None:
+            return jsonify({"error": "Each item needs Id and Delta", "Index": index}), 400
+        try:
+            if isinstance(item["Id"], bool):
+                raise ValueError("Invalid Id")
+            item_id = int(item["Id"])
+            delta = parse_decimal(item.get("Delta", 0))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid Id/Delta", "Index": index}), 400
+        deltas[item_id] = deltas.get(item_id, 0) + delta
+
+    reason = data.get("Reason") if isinstance(data, dict) else None
+    new_qty = apply_stock_deltas(deltas, reason=reason, source="adjust")
+    missing = sorted(set(deltas) - set(new_qty))
+    if missing:
+        db.session.rollback()
+        return jsonify({"error": "Stock item not found", "NotFound": missing}), 404
+
+    db.session.commit()
+
+    return jsonify({
+        "status": "ok",
+        "Items": [{"Id": item_id, "NewQty": float(qty)} for item_id, qty in sorted(new_qty.items())],
+    })
+
+
+@api_bp.post("/stock/snapshots")
+def create_stock_snapshot():
+    """
+    Migawka stanów wszystkich pozycji – wołana okresowo (np. raz dziennie).
+    """
+    taken_at = take_snapshot()
     db.session.commit()
+    return jsonify({"status": "ok", "TakenAt": taken_at.isoformat()}), 201
+
+
+@api_bp.get("/stock/at")
+def get_stock_at():
+    """
+    Stan magazynu na daną chwilę:
+    /stock/at?time=2026-01-14T18:00:00[&id=3]
+    409, gdy przed `time` nie ma migawki stanów (stany sprzed dziennika są nieznane).
+    """
+    try:
+        moment = _parse_moment(request.args.get("time"))
+    except ValueError:
+        return jsonify({"error": "Invalid or missing time. Expected ISO datetime"}), 400
+
+    item_id = request.args.get("id", type=int)
+    quantities = stock_at(moment, [item_id] if item_id is not None else None)
+    if quantities is None:
+        return jsonify({
+            "error": "No stock snapshot at or before this time",
+            "code": "NO_SNAPSHOT",
+        }), 409
+
+    items_q = Magazyn.query.order_by(Magazyn.Nazwa.asc())
+    if item_id is not None:
+        items_q = items_q.filter(Magazyn.ID == item_id)
+
+    return jsonify({
+        "Time": moment.isoformat(),
+        "Items": [
+            {
+                "Id": x.ID,
+                "Name": x.Nazwa,
+                "Unit": x.Jednostka,
+                "Qty": float(quantities.get(x.ID, 0)),
+            }
+            for x in items_q.all()
+        ],
+    })
+
+
+@api_bp.get("/stock/consumption")
+def get_stock_consumption():
+    """
+    Zużycie (i przyjęcia) per pozycja w okresie [from, to):
+    /stock/consumption?from=2026-01-01&to=2026-02-01[&source=order]
+    Domyślnie: ostatnie 24h.
+    """
+    now = local_now()
+    try:
+        end = _parse_moment(request.args.get("to"), now)
+        start = _parse_moment(request.args.get("from"), end - timedelta(days=1))
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Expected YYYY-MM-DD or ISO datetime"}), 400
+
+    totals = consumption_between(start, end, request.args.get("source"))
+    items = {}
+    if totals:
+        items = {x.ID: x for x in Magazyn.query.filter(Magazyn.ID.in_(list(totals))).all()}
 
-    return jsonify({"status": "ok", "NewQty": float(row.Ilosc)})
+    return jsonify({
+        "From": start.isoformat(),
+        "To": end.isoformat(),
+        "Items": [
+            {
+                "Id": item_id,
+                "Name": items[item_id].Nazwa if item_id in items else None,
+                "Unit": items[item_id].Jednostka if item_id in items else None,
+                "Consumed": float(consumed),
+                "Added": float(added),
+            }
+            for item_id, (consumed, added) in sorted(totals.items())
+        ],
+    })
@@ -1,6 +1,8 @@
 from flask import jsonify, request
+from sqlalchemy import case, func, insert, literal, select, tuple_, update
 
 from flask_api.api import api_bp
+from flask_api.cache import bump_version, get_or_build
 from flask_api.extensions import db
 from flask_api.models import (
     Strefa,
@@ -11,10 +13,15 @@ from flask_api.models import (
     KelnerzyStrefy,    # <-- model tabeli łączącej
 )
 from flask_api.utils import renumber_tables_by_id
+from flask_api.request_body import get_payload
 
 
 DEFAULT_GROUP_ID = 1
 
+# wersja przypisań stref (stoliki/kelnerzy) – podbijana przez sync i delete stref
+# oraz przez zmiany personelu (/staff)
+ZONES_CACHE = "zones"
+
 
 def _ensure_default_zone():
     default_zone = Strefa.query.get(DEFAULT_GROUP_ID)
@@ -33,34 +40,40 @@ def get_table_groups():
     - AssignedStaffIds: lista Pracownicy_ID kelnerów w strefie
     Czytamy z tabel łączących (many-to-many).
     """
-    strefy = Strefa.query.all()
-    result = []
-
-    for strefa in strefy:
-        # stoliki przypisane do strefy
-        table_links = StolikiStrefy.query.filter_by(Strefa_ID=strefa.ID).all()
-        table_ids = [x.Stoliki_ID for x in table_links]
-
-        # kelnerzy przypisani do strefy (zwracamy Pracownicy_ID jak wcześniej)
-        waiter_links = KelnerzyStrefy.query.filter_by(Strefa_ID=strefa.ID).all()
-        kelner_ids = [x.Kelnerzy_ID for x in waiter_links]
-
-        if kelner_ids:
-            kelnerzy = Kelnerzy.query.filter(Kelnerzy.ID.in_(kelner_ids)).all()
-            staff_ids = [k.Pracownicy_ID for k in kelnerzy]
-        else:
-            staff_ids = []
-
-        result.append(
-            {
-                "Id": strefa.ID,
-                "Name": strefa.Nazwa,
-                "AssignedTableIds": table_ids,
-                "AssignedStaffIds": staff_ids,
-            }
-        )
-
-    return jsonify(result)
+    return jsonify(get_or_build(ZONES_CACHE, "groups", _build_table_groups))
+
+
+def _build_table_groups() -> list[dict]:
+    # 3 zapytania niezależnie od liczby stref, grupowanie w pamięci
+    strefy = db.session.query(Strefa.ID, Strefa.Nazwa).order_by(Strefa.ID.asc()).all()
+
+    tables_by_zone: dict[int, list[int]] = {}
+    for zone_id, table_id in (
+        db.session.query(StolikiStrefy.Strefa_ID, StolikiStrefy.Stoliki_ID)
+        .order_by(StolikiStrefy.Stoliki_ID.asc())
+        .all()
+    ):
+        tables_by_zone.setdefault(zone_id, []).append(table_id)
+
+    # kelnerzy przypisani do strefy (zwracamy Pracownicy_ID jak wcześniej)
+    staff_by_zone: dict[int, list[int]] = {}
+    for zone_id, staff_id in (
+        db.session.query(KelnerzyStrefy.Strefa_ID, Kelnerzy.Pracownicy_ID)
+        .join(Kelnerzy, Kelnerzy.ID == KelnerzyStrefy.Kelnerzy_ID)
+        .order_by(Kelnerzy.Pracownicy_ID.asc())
+        .all()
+    ):
+        staff_by_zone.setdefault(zone_id, []).append(staff_id)
+
+    return [
+        {
+            "Id": zone_id,
+            "Name": name,
+            "AssignedTableIds": tables_by_zone.get(zone_id, []),
+            "AssignedStaffIds": staff_by_zone.get(zone_id, []),
+        }
+        for zone_id, name in strefy
+    ]
 
 
 @api_bp.post("/table-groups/sync")
@@ -70,36 +83,21 @@ def sync_table_groups():
     payload: [{Id, Name, AssignedTableIds, AssignedStaffIds}, ...]
 
     Nowe zachowanie:
-    - replace relacji w tabelach łączących
+    - diff relacji w tabelach łączących (dla stref z payloadu): hurtowe INSERT/DELETE
+      tylko dla par, które się zmieniły
     - utrzymanie legacy: Stoliki.Strefa_ID i Kelnerzy.Strefa_ID jako "primary zone"
-      (pierwsza strefa z payloadu dla danego obiektu, a jeśli brak -> DEFAULT_GROUP_ID)
+      (pierwsza strefa z payloadu dla danego obiektu, a jeśli brak -> DEFAULT_GROUP_ID),
+      ustawiane jednym UPDATE ... CASE na tabelę
     """
-    data = request.get_json(silent=True) or []
+    data = get_payload([])
     if not isinstance(data, list):
         return jsonify({"error": "Expected a JSON array"}), 400
 
     _ensure_default_zone()
 
-    # 1) upsert stref
-    zone_ids = []
-    for item in data:
-        gid = item.get("Id")
-        name = item.get("Name", "")
-        if gid is None:
-            continue
-        gid = int(gid)
-        zone_ids.append(gid)
-
-        strefa = Strefa.query.get(gid)
-        if not strefa:
-            db.session.add(Strefa(ID=gid, Nazwa=name))
-        else:
-            strefa.Nazwa = name
-
-    db.session.flush()
-
-    # 2) Zbuduj mapy z payloadu:
-    #    zone -> tables/staff
+    # 1) Zbuduj mapy z payloadu:
+    #    zone -> name/tables/staff
+    zone_names: dict[int, str] = {}
     zone_to_tables: dict[int, set[int]] = {}
     zone_to_staff: dict[int, set[int]] = {}
 
@@ -112,6 +110,7 @@ def sync_table_groups():
         if gid is None:
             continue
         gid = int(gid)
+        zone_names[gid] = item.get("Name", "")
 
         tset = zone_to_tables.setdefault(gid, set())
         for tid in (item.get("AssignedTableIds") or []):
@@ -126,82 +125,149 @@ def sync_table_groups():
             sset.add(sid)
             staff_primary_zone.setdefault(sid, gid)
 
-    # 3) REPLACE relacji stolik-strefa w tabeli łączącej (per strefa)
-    #    Czyścimy tylko strefy, które przyszły w payloadzie (nie ruszamy innych, jeśli istnieją dodatkowo)
-    if zone_ids:
-        StolikiStrefy.query.filter(StolikiStrefy.Strefa_ID.in_(zone_ids)).delete(synchronize_session=False)
-        db.session.flush()
+    zone_ids = list(zone_names)
 
-    # Wstaw nowe relacje
-    for gid, tids in zone_to_tables.items():
-        for tid in tids:
-            # jeśli stolik nie istnieje w Stoliki, to go utwórz (żeby przypisanie działało)
-            st = Stoliki.query.get(tid)
-            if not st:
-                st = Stoliki(ID=tid, Ile_osob=4, Strefa_ID=DEFAULT_GROUP_ID)
-                db.session.add(st)
-                db.session.flush()
-
-            db.session.add(StolikiStrefy(Stoliki_ID=tid, Strefa_ID=gid))
-
-    db.session.flush()
-
-    # 4) REPLACE relacji kelner-strefa (per strefa)
+    # 2) upsert stref: jedno zapytanie o istniejące, zmiany hurtem
     if zone_ids:
-        KelnerzyStrefy.query.filter(KelnerzyStrefy.Strefa_ID.in_(zone_ids)).delete(synchronize_session=False)
-        db.session.flush()
-
-    # Musimy mapować AssignedStaffIds (Pracownicy.ID) -> Kelnerzy.ID
-    payload_staff_ids = set()
-    for sids in zone_to_staff.values():
-        payload_staff_ids |= sids
+        existing_names = dict(
+            db.session.query(Strefa.ID, Strefa.Nazwa).filter(Strefa.ID.in_(zone_ids)).all()
+        )
+        new_zones = [
+            {"ID": gid, "Nazwa": name}
+            for gid, name in zone_names.items()
+            if gid not in existing_names
+        ]
+        renamed_zones = [
+            {"ID": gid, "Nazwa": name}
+            for gid, name in zone_names.items()
+            if gid in existing_names and existing_names[gid] != name
+        ]
+        if new_zones:
+            db.session.execute(insert(Strefa), new_zones)
+        if renamed_zones:
+            db.session.execute(update(Strefa), renamed_zones)
+
+    # 3) jeśli stolik nie istnieje w Stoliki, to go utwórz (żeby przypisanie działało)
+    payload_table_ids = set(table_primary_zone)
+    created_tables = False
+    if payload_table_ids:
+        existing_tables = {
+            row.ID for row in
+            db.session.query(Stoliki.ID).filter(Stoliki.ID.in_(payload_table_ids)).all()
+        }
+        missing_tables = sorted(payload_table_ids - existing_tables)
+        if missing_tables:
+            # Numer zostanie nadany przez renumber_tables_by_id()
+            db.session.execute(insert(Stoliki), [
+                {"ID": tid, "Numer": tid, "Ile_osob": 4, "Strefa_ID": DEFAULT_GROUP_ID}
+                for tid in missing_tables
+            ])
+            created_tables = True
+
+    # 4) DIFF relacji stolik-strefa
+    #    Ruszamy tylko strefy, które przyszły w payloadzie (nie ruszamy innych, jeśli istnieją dodatkowo)
+    desired_table_links = {
+        (gid, tid)
+        for gid, tids in zone_to_tables.items()
+        for tid in tids
+    }
+    _apply_link_diff(StolikiStrefy, StolikiStrefy.Stoliki_ID, zone_ids, desired_table_links)
+
+    # 5) Musimy mapować AssignedStaffIds (Pracownicy.ID) -> Kelnerzy.ID
+    payload_staff_ids = set(staff_primary_zone)
 
     staff_to_kelner_id: dict[int, int] = {}
     if payload_staff_ids:
-        # zapewnij, że pracownik istnieje
-        existing_workers = {p.ID for p in Pracownicy.query.filter(Pracownicy.ID.in_(list(payload_staff_ids))).all()}
-
-        # pobierz istniejące Kelnerzy dla pracowników
-        existing_kelnerzy = Kelnerzy.query.filter(Kelnerzy.Pracownicy_ID.in_(list(payload_staff_ids))).all()
-        for k in existing_kelnerzy:
-            staff_to_kelner_id[k.Pracownicy_ID] = k.ID
+        # pracownicy z payloadu + ich (ewentualny) rekord Kelnerzy – jedno zapytanie
+        rows = (
+            db.session.query(Pracownicy.ID, Kelnerzy.ID)
+            .outerjoin(Kelnerzy, Kelnerzy.Pracownicy_ID == Pracownicy.ID)
+            .filter(Pracownicy.ID.in_(payload_staff_ids))
+            .all()
+        )
+        # jeśli UI wysłał ID którego nie ma w Pracownicy, pomijamy (żeby nie robić 500)
+        missing_waiters = []
+        for staff_id, kelner_id in rows:
+            if kelner_id is None:
+                missing_waiters.append(staff_id)
+            else:
+                staff_to_kelner_id[staff_id] = kelner_id
 
         # utwórz brakujących kelnerów dla istniejących pracowników
-        for sid in payload_staff_ids:
-            if sid not in existing_workers:
-                # jeśli UI wysłał ID którego nie ma w Pracownicy, pomijamy (żeby nie robić 500)
-                continue
-            if sid not in staff_to_kelner_id:
-                new_k = Kelnerzy(Pracownicy_ID=sid, Strefa_ID=DEFAULT_GROUP_ID)
-                db.session.add(new_k)
-                db.session.flush()
-                staff_to_kelner_id[sid] = new_k.ID
-
-    # Wstaw relacje kelner-strefa
-    for gid, sids in zone_to_staff.items():
-        for sid in sids:
-            kelner_id = staff_to_kelner_id.get(sid)
-            if not kelner_id:
-                continue
-            db.session.add(KelnerzyStrefy(Kelnerzy_ID=kelner_id, Strefa_ID=gid))
-
-    db.session.flush()
-
-    # 5) LEGACY: ustaw "primary strefę" w Stoliki.Strefa_ID i Kelnerzy.Strefa_ID
-    #    (żeby stare endpointy / logika nadal działały)
-    # Stoliki
-    all_tables = Stoliki.query.all()
-    for t in all_tables:
-        t.Strefa_ID = table_primary_zone.get(t.ID, DEFAULT_GROUP_ID)
+        if missing_waiters:
+            db.session.execute(insert(Kelnerzy), [
+                {"Pracownicy_ID": sid, "Strefa_ID": DEFAULT_GROUP_ID}
+                for sid in missing_waiters
+            ])
+            staff_to_kelner_id.update(
+                db.session.query(Kelnerzy.Pracownicy_ID, Kelnerzy.ID)
+                .filter(Kelnerzy.Pracownicy_ID.in_(missing_waiters))
+                .all()
+            )
+
+    # 6) DIFF relacji kelner-strefa
+    desired_waiter_links = {
+        (gid, staff_to_kelner_id[sid])
+        for gid, sids in zone_to_staff.items()
+        for sid in sids
+        if sid in staff_to_kelner_id
+    }
+    _apply_link_diff(KelnerzyStrefy, KelnerzyStrefy.Kelnerzy_ID, zone_ids, desired_waiter_links)
+
+    # 7) LEGACY: ustaw "primary strefę" w Stoliki.Strefa_ID i Kelnerzy.Strefa_ID
+    #    (żeby stare endpointy / logika nadal działały) – jeden UPDATE na tabelę,
+    #    zapisujemy tylko wiersze, w których wartość się zmienia
+    table_zone = _primary_zone_case(Stoliki.ID, table_primary_zone)
+    (Stoliki.query
+     .filter(Stoliki.Strefa_ID != table_zone)
+     .update({Stoliki.Strefa_ID: table_zone}, synchronize_session=False))
 
     # Kelnerzy – po Pracownicy_ID
-    all_waiters = Kelnerzy.query.all()
-    for k in all_waiters:
-        k.Strefa_ID = staff_primary_zone.get(k.Pracownicy_ID, DEFAULT_GROUP_ID)
+    waiter_zone = _primary_zone_case(Kelnerzy.Pracownicy_ID, staff_primary_zone)
+    (Kelnerzy.query
+     .filter(Kelnerzy.Strefa_ID != waiter_zone)
+     .update({Kelnerzy.Strefa_ID: waiter_zone}, synchronize_session=False))
 
-    renumber_tables_by_id()
+    if created_tables:
+        renumber_tables_by_id()
     db.session.commit()
+    bump_version(ZONES_CACHE)
     return jsonify({"status": "ok", "groups": len(data)})
+
+
+def _apply_link_diff(model, member_col, zone_ids: list[int], desired: set[tuple[int, int]]) -> None:
+    """
+    Porównuje istniejące pary (Strefa_ID, member) dla podanych stref z docelowymi
+    i wykonuje tylko brakujące INSERT-y oraz zbędne DELETE-y (hurtem).
+    """
+    if not zone_ids:
+        return
+
+    existing = set(
+        db.session.query(model.Strefa_ID, member_col)
+        .filter(model.Strefa_ID.in_(zone_ids))
+        .all()
+    )
+
+    to_delete = existing - desired
+    to_add = desired - existing
+
+    if to_delete:
+        (model.query
+         .filter(tuple_(model.Strefa_ID, member_col).in_(sorted(to_delete)))
+         .delete(synchronize_session=False))
+
+    if to_add:
+        db.session.execute(insert(model), [
+            {"Strefa_ID": gid, member_col.key: member_id}
+            for gid, member_id in sorted(to_add)
+        ])
+
+
+def _primary_zone_case(key_col, primary_zone: dict[int, int]):
+    if not primary_zone:
+        return literal(DEFAULT_GROUP_ID)
+    return case(primary_zone, value=key_col, else_=DEFAULT_GROUP_ID)
 
 
 @api_bp.delete("/table-groups/<int:group_id>")
@@ -219,24 +285,29 @@ def delete_table_group(group_id: int):
     KelnerzyStrefy.query.filter_by(Strefa_ID=group_id).delete(synchronize_session=False)
     db.session.flush()
 
-    tables = Stoliki.query.filter_by(Strefa_ID=group_id).all()
-    for table in tables:
-        remaining = (
-            StolikiStrefy.query.filter_by(Stoliki_ID=table.ID)
-            .with_entities(StolikiStrefy.Strefa_ID)
-            .all()
-        )
-        table.Strefa_ID = remaining[0][0] if remaining else DEFAULT_GROUP_ID
+    # nowa "primary strefa" = najmniejsza pozostała strefa obiektu (albo domyślna),
+    # liczona podzapytaniem z MIN dla wszystkich wierszy naraz – jeden UPDATE na tabelę
+    table_fallback = func.coalesce(
+        select(func.min(StolikiStrefy.Strefa_ID))
+        .where(StolikiStrefy.Stoliki_ID == Stoliki.ID)
+        .scalar_subquery(),
+        DEFAULT_GROUP_ID,
+    )
+    (Stoliki.query
+     .filter(Stoliki.Strefa_ID == group_id)
+     .update({Stoliki.Strefa_ID: table_fallback}, synchronize_session=False))
 
-    waiters = Kelnerzy.query.filter_by(Strefa_ID=group_id).all()
-    for waiter in waiters:
-        remaining = (
-            KelnerzyStrefy.query.filter_by(Kelnerzy_ID=waiter.ID)
-            .with_entities(KelnerzyStrefy.Strefa_ID)
-            .all()
-        )
-        waiter.Strefa_ID = remaining[0][0] if remaining else DEFAULT_GROUP_ID
+    waiter_fallback = func.coalesce(
+        select(func.min(KelnerzyStrefy.Strefa_ID))
+        .where(KelnerzyStrefy.Kelnerzy_ID == Kelnerzy.ID)
+        .scalar_subquery(),
+        DEFAULT_GROUP_ID,
+    )
+    (Kelnerzy.query
+     .filter(Kelnerzy.Strefa_ID == group_id)
+     .update({Kelnerzy.Strefa_ID: waiter_fallback}, synchronize_session=False))
 
     db.session.delete(strefa)
     db.session.commit()
+    bump_version(ZONES_CACHE)
     return jsonify({"status": "ok"})
@@ -1,11 +1,27 @@
-from flask import jsonify, request
+import math
+from datetime import timedelta
+
+from flask import current_app, jsonify, request
+from sqlalchemy import and_, case, func, or_
 
 from flask_api.api import api_bp
+from flask_api.api.table_groups import ZONES_CACHE
+from flask_api.cache import bump_version, get_or_build
 from flask_api.extensions import db
-from flask_api.models import Strefa, Stoliki, MapaStolikow
+from flask_api.spatial import TableGrid
+from flask_api.models import Strefa, Stoliki, StolikiStrefy, MapaStolikow
 from flask_api.utils import renumber_tables_by_id
-from flask_api.models import Zamowienia, Zam_Poz, Menu
-from flask_api.utils import bool_from_status, bool_from_wydane
+from flask_api.models import Zamowienia, Zam_Poz, Menu, Rezerwacje
+from flask_api.utils import WYDANE_TRUE, local_now, order_to_json
+from flask_api.request_body import get_payload
+
+# cache geometrii mapy (unieważniany tylko przez zmiany stolików)
+TABLES_CACHE = "tables"
+
+TABLE_STATUS_FREE = "wolny"
+TABLE_STATUS_OCCUPIED = "zajęty"
+TABLE_STATUS_SERVED = "obsłużony"
+TABLE_STATUS_RESERVED = "zarezerwowany"
 
 # -------------------------
 # Helpers
@@ -19,22 +35,22 @@ def _safe_int(value, default: int) -> int:
         return default
 
 
-# -------------------------
-# GET /tables
-# -------------------------
-@api_bp.get("/tables")
-def get_tables():
+def _build_layout() -> dict[int, list[dict]]:
+    """
+    Statyczna część mapy (bez statusu), pogrupowana po Poziom.
+    """
     rows = (
         db.session.query(Stoliki, MapaStolikow)
         .join(MapaStolikow, MapaStolikow.Stoliki_ID == Stoliki.ID)
+        .order_by(MapaStolikow.Poziom.asc(), Stoliki.ID.asc())
         .all()
     )
 
-    result = []
+    layout: dict[int, list[dict]] = {}
     for stolik, mapa in rows:
         level = _safe_int(getattr(mapa, "Poziom", None), 1)
 
-        result.append(
+        layout.setdefault(level, []).append(
             {
                 "Id": stolik.ID,
                 "Name": mapa.Nazwa,
@@ -42,21 +58,192 @@ def get_tables():
                 "Y": _safe_int(mapa.Y_Pos, 0),
                 "Rotation": _safe_int(getattr(mapa, "Rotation", None), 0),
                 "Ile_osob": _safe_int(stolik.Ile_osob, 4),
-                "status": "wolny",
                 "Level": level,  # zawsze int
             }
         )
 
+    return layout
+
+
+def get_table_layout() -> dict[int, list[dict]]:
+    return get_or_build(TABLES_CACHE, "layout", _build_layout)
+
+
+def get_table_grid(level: int) -> TableGrid:
+    """Indeks przestrzenny jednego poziomu – przebudowywany po zmianie mapy."""
+    return get_or_build(
+        TABLES_CACHE,
+        ("grid", level),
+        lambda: TableGrid(get_table_layout().get(level, [])),
+    )
+
+
+def _reservation_window(start, end):
+    start_time = start.time().replace(microsecond=0)
+    end_time = end.time().replace(microsecond=0)
+    if start.date() == end.date():
+        return and_(
+            Rezerwacje.Data == start.date(),
+            Rezerwacje.Godzina >= start_time,
+            Rezerwacje.Godzina <= end_time,
+        )
+    return or_(
+        and_(Rezerwacje.Data == start.date(), Rezerwacje.Godzina >= start_time),
+        and_(Rezerwacje.Data == end.date(), Rezerwacje.Godzina <= end_time),
+    )
+
+
+def get_table_statuses() -> dict[int, str]:
+    """
+    Status "na żywo" dla stolików, które mają otwarte zamówienie albo
+    zbliżającą się rezerwację – jedno zapytanie z agregatami.
+    Stolików, których nie ma w wyniku, dotyczy TABLE_STATUS_FREE.
+    """
+    now = local_now()
+    soon = now + timedelta(minutes=int(current_app.config.get("TABLE_RESERVED_SOON_MINUTES", 60)))
+
+    is_served = func.upper(Zam_Poz.Wydane).in_(WYDANE_TRUE)
+    orders_sq = (
+        db.session.query(
+            Zamowienia.Stoliki_ID.label("table_id"),
+            func.count(Zam_Poz.ID).label("item_count"),
+            func.sum(case((Zam_Poz.ID.is_(None), 0), (is_served, 0), else_=1)).label("unserved_count"),
+        )
+        .outerjoin(Zam_Poz, Zam_Poz.Zamowienia_ID == Zamowienia.ID)
+        .filter(Zamowienia.Status == "open")
+        .group_by(Zamowienia.Stoliki_ID)
+        .subquery()
+    )
+
+    reservations_sq = (
+        db.session.query(
+            Rezerwacje.Stoliki_ID.label("table_id"),
+            func.count(Rezerwacje.ID).label("upcoming"),
+        )
+        .filter(Rezerwacje.Stoliki_ID.isnot(None))
+        .filter(_reservation_window(now, soon))
+        .group_by(Rezerwacje.Stoliki_ID)
+        .subquery()
+    )
+
+    rows = (
+        db.session.query(
+            Stoliki.ID,
+            orders_sq.c.table_id,
+            orders_sq.c.item_count,
+            orders_sq.c.unserved_count,
+            reservations_sq.c.upcoming,
+        )
+        .outerjoin(orders_sq, orders_sq.c.table_id == Stoliki.ID)
+        .outerjoin(reservations_sq, reservations_sq.c.table_id == Stoliki.ID)
+        .filter(or_(orders_sq.c.table_id.isnot(None), reservations_sq.c.table_id.isnot(None)))
+        .all()
+    )
+
+    statuses = {}
+    for table_id, open_order, items, unserved, upcoming in rows:
+        if open_order is not None:
+            if items and not unserved:
+                statuses[table_id] = TABLE_STATUS_SERVED
+            else:
+                statuses[table_id] = TABLE_STATUS_OCCUPIED
+        elif upcoming:
+            statuses[table_id] = TABLE_STATUS_RESERVED
+    return statuses
+
+
+# -------------------------
+# GET /tables
+# GET /tables?level=1
+# -------------------------
+@api_bp.get("/tables")
+def get_tables():
+    layout = get_table_layout()
+
+    level = request.args.get("level", type=int)
+    levels = [level] if level is not None else sorted(layout)
+
+    statuses = get_table_statuses()
+
+    result = []
+    for lvl in levels:
+        for table in layout.get(lvl, ()):
+            result.append({**table, "status": statuses.get(table["Id"], TABLE_STATUS_FREE)})
+
     return jsonify(result)
 
 
+def _coord_arg(name: str) -> float | None:
+    """
+    Współrzędna z query string; None, gdy brak, niepoprawna albo nieskończona
+    (type=float przepuszcza "inf"/"nan", a siatka stolików liczy na nich math.floor).
+    """
+    value = request.args.get(name, type=float)
+    if value is None or not math.isfinite(value):
+        return None
+    return value
+
+
+# -------------------------
+# GET /tables/viewport?level=1&x1=0&y1=0&x2=1920&y2=1080
+# Tylko stoliki widoczne w prostokącie danego poziomu
+# -------------------------
+@api_bp.get("/tables/viewport")
+def get_tables_in_viewport():
+    level = request.args.get("level", type=int)
+    coords = [_coord_arg(name) for name in ("x1", "y1", "x2", "y2")]
+    if level is None or any(c is None for c in coords):
+        return jsonify({"error": "Expected query params: level, x1, y1, x2, y2"}), 400
+
+    tables = get_table_grid(level).query_rect(*coords)
+    statuses = get_table_statuses() if tables else {}
+
+    return jsonify([
+        {**table, "status": statuses.get(table["Id"], TABLE_STATUS_FREE)}
+        for table in tables
+    ])
+
+
+# -------------------------
+# GET /tables/nearest-free?level=1&x=400&y=300&people=4&limit=3
+# Najbliższe wolne stoliki z co najmniej `people` miejscami
+# -------------------------
+@api_bp.get("/tables/nearest-free")
+def get_nearest_free_tables():
+    level = request.args.get("level", type=int)
+    x = _coord_arg("x")
+    y = _coord_arg("y")
+    if level is None or x is None or y is None:
+        return jsonify({"error": "Expected query params: level, x, y"}), 400
+
+    people = max(request.args.get("people", 1, type=int), 1)
+    limit = min(max(request.args.get("limit", 1, type=int), 1), 50)
+
+    grid = get_table_grid(level)
+    if not len(grid):
+        return jsonify([])
+
+    statuses = get_table_statuses()
+
+    def is_candidate(table: dict) -> bool:
+        return (
+            table["Ile_osob"] >= people
+            and statuses.get(table["Id"], TABLE_STATUS_FREE) == TABLE_STATUS_FREE
+        )
+
+    return jsonify([
+        {**table, "status": TABLE_STATUS_FREE, "Distance": round(dist, 1)}
+        for dist, table in grid.nearest(x, y, predicate=is_candidate, limit=limit)
+    ])
+
+
 # -------------------------
 # POST /tables/sync
 # UPSERT mapy + usuwanie brakujących
 # -------------------------
 @api_bp.post("/tables/sync")
 def sync_tables():
-    data = request.get_json(silent=True) or []
+    data = get_payload([])
     if not isinstance(data, list):
         return jsonify({"error": "Expected a JSON array"}), 400
 
@@ -146,6 +333,9 @@ def sync_tables():
 
     renumber_tables_by_id()
     db.session.commit()
+    bump_version(TABLES_CACHE)
+    # sync może dopiąć stoliki do strefy domyślnej
+    bump_version(ZONES_CACHE)
     return jsonify({"status": "ok", "count": count})
 
 
@@ -170,6 +360,7 @@ def patch_table(table_id: int):
 
     stolik.Ile_osob = people
     db.session.commit()
+    bump_version(TABLES_CACHE)
 
     return jsonify({"status": "ok", "Id": stolik.ID, "Ile_osob": stolik.Ile_osob}), 200
 
@@ -199,38 +390,81 @@ def get_active_order_for_table(table_id: int):
         .all()
     )
 
-    items = []
-    any_items = False
-    all_served = True
-
-    for poz, menu in rows:
-        any_items = True
-        served = bool_from_wydane(poz.Wydane)
-        if not served:
-            all_served = False
-
-        items.append({
-            "ItemId": poz.ID,
-            "MenuId": menu.ID,
-            "Name": menu.Nazwa,
-            "Qty": int(poz.Ilosc),
-            "IsServed": served,
-            # opcjonalnie (przydatne w UI/rachunku):
-            "Price": float(menu.Cena) if menu.Cena is not None else 0.0,
-            "LineTotal": (float(menu.Cena) * int(poz.Ilosc)) if menu.Cena is not None else 0.0,
+    return jsonify({"TableId": table_id, "Order": order_to_json(zam, rows)}), 200
+
+
+# -------------------------
+# GET /tables/orders
+# GET /tables/orders?level=1
+# GET /tables/orders?zone=2
+# Najnowsze otwarte zamówienie (z pozycjami) dla każdego stolika – stała liczba zapytań.
+# -------------------------
+@api_bp.get("/tables/orders")
+def get_active_orders_for_tables():
+    level = request.args.get("level", type=int)
+    zone = request.args.get("zone", type=int)
+
+    # 1) stoliki w zakresie
+    tables_q = db.session.query(Stoliki.ID)
+    if level is not None:
+        tables_q = tables_q.join(MapaStolikow, MapaStolikow.Stoliki_ID == Stoliki.ID).filter(MapaStolikow.Poziom == level)
+    if zone is not None:
+        tables_q = tables_q.join(StolikiStrefy, StolikiStrefy.Stoliki_ID == Stoliki.ID).filter(StolikiStrefy.Strefa_ID == zone)
+    table_ids = sorted({row.ID for row in tables_q.all()})
+
+    if not table_ids:
+        return jsonify([])
+
+    # 2) "latest per group": MAX(Data) per stolik (indeks Stoliki_ID, Status, Data),
+    #    potem join z powrotem po (Stoliki_ID, Data)
+    latest_sq = (
+        db.session.query(
+            Zamowienia.Stoliki_ID.label("table_id"),
+            func.max(Zamowienia.Data).label("latest"),
+        )
+        .filter(Zamowienia.Status == "open")
+        .filter(Zamowienia.Stoliki_ID.in_(table_ids))
+        .group_by(Zamowienia.Stoliki_ID)
+        .subquery()
+    )
+    candidates = (
+        Zamowienia.query
+        .join(latest_sq, and_(
+            latest_sq.c.table_id == Zamowienia.Stoliki_ID,
+            latest_sq.c.latest == Zamowienia.Data,
+        ))
+        .filter(Zamowienia.Status == "open")
+        .all()
+    )
+
+    # przy identycznym Data wygrywa wyższe ID (jak przy ORDER BY Data DESC)
+    latest_by_table: dict[int, Zamowienia] = {}
+    for zam in candidates:
+        current = latest_by_table.get(zam.Stoliki_ID)
+        if current is None or zam.ID > current.ID:
+            latest_by_table[zam.Stoliki_ID] = zam
+
+    # 3) pozycje wszystkich wybranych zamówień jednym joinem
+    rows_by_order: dict[int, list] = {}
+    if latest_by_table:
+        order_ids = [zam.ID for zam in latest_by_table.values()]
+        rows = (
+            db.session.query(Zam_Poz, Menu)
+            .join(Menu, Menu.ID == Zam_Poz.Menu_ID)
+            .filter(Zam_Poz.Zamowienia_ID.in_(order_ids))
+            .order_by(Zam_Poz.ID.asc())
+            .all()
+        )
+        for poz, menu in rows:
+            rows_by_order.setdefault(poz.Zamowienia_ID, []).append((poz, menu))
+
+    result = []
+    for table_id in table_ids:
+        zam = latest_by_table.get(table_id)
+        result.append({
+            "TableId": table_id,
+            "Order": order_to_json(zam, rows_by_order.get(zam.ID, [])) if zam else None,
         })
 
-    order_json = {
-        "OrderId": zam.ID,
-        "TableId": table_id,
-        "WaiterId": zam.Kelnerzy_ID,
-        "Items": items,
-        "IsServed": (all_served if any_items else False),
-        "IsSettled": bool_from_status(zam.Status),
-        "CreatedAt": zam.Data.isoformat(),
-        "Notes": zam.Uwagi,
-        "Status": zam.Status,
-    }
-
-    return jsonify({"TableId": table_id, "Order": order_json}), 200
+    return jsonify(result)
 
@@ -0,0 +1,131 @@
+from flask import jsonify
+from sqlalchemy import or_
+
+from flask_api.api import api_bp
+from flask_api.api.table_groups import ZONES_CACHE
+from flask_api.cache import get_or_build
+from flask_api.extensions import db
+from flask_api.models import Kelnerzy, KelnerzyStrefy, Menu, StolikiStrefy, Zamowienia, Zam_Poz
+from flask_api.utils import order_to_json
+
+
+class ZoneRouting:
+    """
+    Indeks "kelner <-> stolik" wyliczony ze stref (Stoliki_Strefy + Kelnerzy_Strefy).
+    Kelner obsługuje stolik, jeśli mają co najmniej jedną wspólną strefę.
+    Odpowiedzi to zwykłe odczyty ze słowników.
+    """
+
+    def __init__(self, table_links, waiter_links):
+        tables_by_zone: dict[int, set[int]] = {}
+        for zone_id, table_id in table_links:
+            tables_by_zone.setdefault(zone_id, set()).add(table_id)
+
+        self.staff_by_waiter: dict[int, int] = {}
+        waiters_by_zone: dict[int, set[int]] = {}
+        for waiter_id, staff_id, zone_id in waiter_links:
+            self.staff_by_waiter[waiter_id] = staff_id
+            if zone_id is not None:
+                waiters_by_zone.setdefault(zone_id, set()).add(waiter_id)
+
+        tables_by_waiter: dict[int, set[int]] = {}
+        waiters_by_table: dict[int, set[int]] = {}
+        for zone_id, waiter_ids in waiters_by_zone.items():
+            table_ids = tables_by_zone.get(zone_id, set())
+            for waiter_id in waiter_ids:
+                tables_by_waiter.setdefault(waiter_id, set()).update(table_ids)
+            for table_id in table_ids:
+                waiters_by_table.setdefault(table_id, set()).update(waiter_ids)
+
+        self.tables_by_waiter = {k: tuple(sorted(v)) for k, v in tables_by_waiter.items()}
+        self.waiters_by_table = {k: tuple(sorted(v)) for k, v in waiters_by_table.items()}
+
+    def tables_for_waiter(self, waiter_id: int) -> tuple[int, ...]:
+        return self.tables_by_waiter.get(waiter_id, ())
+
+    def waiters_for_table(self, table_id: int) -> tuple[int, ...]:
+        return self.waiters_by_table.get(table_id, ())
+
+
+def _build_routing() -> ZoneRouting:
+    table_links = db.session.query(StolikiStrefy.Strefa_ID, StolikiStrefy.Stoliki_ID).all()
+    # outer join: kelner bez strefy też jest znany (pusta lista stolików zamiast 404)
+    waiter_links = (
+        db.session.query(Kelnerzy.ID, Kelnerzy.Pracownicy_ID, KelnerzyStrefy.Strefa_ID)
+        .outerjoin(KelnerzyStrefy, KelnerzyStrefy.Kelnerzy_ID == Kelnerzy.ID)
+        .all()
+    )
+    return ZoneRouting(table_links, waiter_links)
+
+
+def get_zone_routing() -> ZoneRouting:
+    """
+    Indeks z cache pod wersją ZONES_CACHE – każda zmiana stref, stolików albo kelnerów
+    (w tym /staff: create, sync, delete) musi po commit wołać bump_version(ZONES_CACHE).
+    """
+    return get_or_build(ZONES_CACHE, "routing", _build_routing)
+
+
+@api_bp.get("/waiters/<int:waiter_id>/tables")
+def get_waiter_tables(waiter_id: int):
+    routing = get_zone_routing()
+    if waiter_id not in routing.staff_by_waiter:
+        return jsonify({"error": "Waiter not found"}), 404
+
+    return jsonify({
+        "WaiterId": waiter_id,
+        "StaffId": routing.staff_by_waiter[waiter_id],
+        "TableIds": list(routing.tables_for_waiter(waiter_id)),
+    })
+
+
+@api_bp.get("/tables/<int:table_id>/waiters")
+def get_table_waiters(table_id: int):
+    routing = get_zone_routing()
+    return jsonify({
+        "TableId": table_id,
+        "Waiters": [
+            {"WaiterId": waiter_id, "StaffId": routing.staff_by_waiter.get(waiter_id)}
+            for waiter_id in routing.waiters_for_table(table_id)
+        ],
+    })
+
+
+@api_bp.get("/waiters/<int:waiter_id>/orders")
+def get_waiter_orders(waiter_id: int):
+    """
+    Otwarte zamówienia kelnera: przypisane do niego albo ze stolików z jego stref.
+    Jedno zapytanie (zamówienia + pozycje + menu).
+    """
+    routing = get_zone_routing()
+    if waiter_id not in routing.staff_by_waiter:
+        return jsonify({"error": "Waiter not found"}), 404
+
+    table_ids = routing.tables_for_waiter(waiter_id)
+    scope = Zamowienia.Kelnerzy_ID == waiter_id
+    if table_ids:
+        scope = or_(scope, Zamowienia.Stoliki_ID.in_(table_ids))
+
+    rows = (
+        db.session.query(Zamowienia, Zam_Poz, Menu)
+        .outerjoin(Zam_Poz, Zam_Poz.Zamowienia_ID == Zamowienia.ID)
+        .outerjoin(Menu, Menu.ID == Zam_Poz.Menu_ID)
+        .filter(Zamowienia.Status == "open")
+        .filter(scope)
+        .order_by(Zamowienia.Data.asc(), Zamowienia.ID.asc(), Zam_Poz.ID.asc())
+        .all()
+    )
+
+    orders: dict[int, Zamowienia] = {}
+    items_by_order: dict[int, list] = {}
+    for zam, poz, menu in rows:
+        orders.setdefault(zam.ID, zam)
+        items = items_by_order.setdefault(zam.ID, [])
+        if poz is not None and menu is not None:
+            items.append((poz, menu))
+
+    return jsonify({
+        "WaiterId": waiter_id,
+        "TableIds": list(table_ids),
+        "Orders": [order_to_json(zam, items_by_order[order_id]) for order_id, zam in orders.items()],
+    })
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from flask import current_app
+
+# Prosty cache w pamięci procesu, unieważniany wersją "przestrzeni nazw"
+# (np. "tables", "zones", "menu"). Endpointy zapisujące podbijają wersję
+# po commit, a odczyty budują wartość od nowa tylko gdy wersja się zmieniła.
+#
+# Wersje są lokalne dla procesu (worker gunicorna), dlatego każdy wpis ma
+# też maksymalny wiek (CACHE_MAX_AGE_SECONDS) – inne workery zobaczą zmianę
+# najpóźniej po tym czasie.
+
+DEFAULT_MAX_AGE_SECONDS = 30
+
+_lock = threading.Lock()
+_versions: dict[str, int] = {}
+_entries: dict[tuple[str, object], tuple[int, float, object]] = {}
+
+
+def _max_age_seconds() -> float:
+    try:
+        return float(current_app.config.get("CACHE_MAX_AGE_SECONDS", DEFAULT_MAX_AGE_SECONDS))
+    except RuntimeError:
+        # poza kontekstem aplikacji (np. skrypty)
+        return DEFAULT_MAX_AGE_SECONDS
+
+
+def get_version(namespace: str) -> int:
+    with _lock:
+        return _versions.get(namespace, 0)
+
+
+def bump_version(namespace: str) -> int:
+    """
+    Unieważnia wszystkie wpisy danej przestrzeni nazw.
+    Wołać PO db.session.commit(), żeby nie zbudować cache z niezatwierdzonych danych.
+    """
+    with _lock:
+        version = _versions.get(namespace, 0) + 1
+        _versions[namespace] = version
+        for key in [k for k in _entries if k[0] == namespace]:
+            del _entries[key]
+        return version
+
+
+def get_or_build(namespace: str, key, builder):
+    """
+    Zwraca zbudowaną wcześniej wartość dla (namespace, key) albo woła builder().
+    Wartości traktujemy jako niemutowalne – wywołujący nie może ich modyfikować.
+    """
+    max_age = _max_age_seconds()
+    now = time.monotonic()
+
+    with _lock:
+        version = _versions.get(namespace, 0)
+        hit = _entries.get((namespace, key))
+        if hit is not None and hit[0] == version and (max_age <= 0 or now - hit[1] < max_age):
+            return hit[2]
+
+    value = builder()
+
+    with _lock:
+        # jeśli w trakcie budowania ktoś podbił wersję, nie zapisujemy starej wartości
+        if _versions.get(namespace, 0) == version:
+            _entries[(namespace, key)] = (version, now, value)
+
+    return value
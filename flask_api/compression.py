@@ -0,0 +1,54 @@
+import gzip
+
+from flask import current_app, request
+
+# Kompresja gzip odpowiedzi (after_request) dla klientów, które ją akceptują
+# (Accept-Encoding z q > 0). Pomijamy małe odpowiedzi, strumienie (SSE),
+# pliki (send_file) i treści już skompresowane (np. /raports/download).
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_LEVEL = 6
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/javascript", "image/svg+xml"}
+
+
+def _is_compressible(response) -> bool:
+    mimetype = response.mimetype or ""
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def _compress_response(response):
+    if not _is_compressible(response):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    # treść zależy od Accept-Encoding – ETag zawsze słaby, także w 304 i odpowiedziach
+    # bez kompresji, żeby 200 (gzip) i 304 dla tego samego zasobu niosły ten sam ETag
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+        or request.accept_encodings["gzip"] <= 0
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < int(current_app.config.get("COMPRESS_MIN_SIZE", DEFAULT_MIN_SIZE)):
+        return response
+
+    level = int(current_app.config.get("COMPRESS_LEVEL", DEFAULT_LEVEL))
+    response.set_data(gzip.compress(data, compresslevel=level, mtime=0))
+    response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+def init_compression(app) -> None:
+    if not app.config.get("COMPRESS_ENABLED", True):
+        return
+    app.after_request(_compress_response)
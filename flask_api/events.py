@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Zdarzenia w pamięci procesu z numeracją rosnącą – klient (SSE albo polling)
+# podaje ostatnie widziane ID i dostaje tylko nowsze. Bufor jest ograniczony,
+# więc bardzo spóźniony klient zobaczy tylko ostatnie `history` zdarzeń.
+#
+# Broker jest lokalny dla workera – nie może być jedynym źródłem zdarzeń, gdy
+# workerów jest kilka. stock_events służy tylko do budzenia strumieni SSE tego
+# procesu; same zdarzenia magazynu są w bazie (Magazyn_Ruchy.Zdarzenie).
+
+DEFAULT_HISTORY = 500
+
+PENDING_KEY = "pending_events"
+
+
+class EventBroker:
+    def __init__(self, history: int = DEFAULT_HISTORY):
+        self._cond = threading.Condition()
+        self._events: deque[dict] = deque(maxlen=history)
+        self._last_id = 0
+
+    @property
+    def last_id(self) -> int:
+        with self._cond:
+            return self._last_id
+
+    def publish(self, event_type: str, data: dict) -> int:
+        with self._cond:
+            self._last_id += 1
+            self._events.append({"Id": self._last_id, "Type": event_type, "Data": data})
+            self._cond.notify_all()
+            return self._last_id
+
+    def since(self, last_id: int) -> list[dict]:
+        with self._cond:
+            return [e for e in self._events if e["Id"] > last_id]
+
+    def wait(self, last_id: int, timeout: float) -> list[dict]:
+        """
+        Blokuje do `timeout` sekund, aż pojawi się zdarzenie nowsze niż last_id.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._last_id <= last_id:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+            return [e for e in self._events if e["Id"] > last_id]
+
+
+stock_events = EventBroker()
+
+
+def publish_after_commit(session, broker: EventBroker, event_type: str, data: dict) -> None:
+    """
+    Zdarzenie zostanie opublikowane dopiero po udanym commit tej sesji
+    (rollback je odrzuca) – żeby nie ogłaszać zmian, których nie ma w bazie.
+    """
+    session.info.setdefault(PENDING_KEY, []).append((broker, event_type, data))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session):
+    for broker, event_type, data in session.info.pop(PENDING_KEY, []):
+        broker.publish(event_type, data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session):
+    session.info.pop(PENDING_KEY, None)
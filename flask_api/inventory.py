@@ -0,0 +1,326 @@
+from decimal import Decimal, InvalidOperation
+
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import case, func, insert, literal
+
+from flask_api.events import publish_after_commit, stock_events
+from flask_api.extensions import db
+from flask_api.models import Magazyn, MagazynRuchy, MagazynStany, Receptury
+from flask_api.utils import local_now
+
+DEPLETE_ON_ADD = "add"
+DEPLETE_ON_SERVE = "serve"
+
+EVENT_STOCK_LOW = "StockLow"
+EVENT_STOCK_RECOVERED = "StockRecovered"
+
+
+def parse_decimal(value) -> Decimal:
+    """
+    Ilości magazynowe liczymy w Decimal (kolumna Numeric), nie w float.
+    Rzuca ValueError dla wartości, których nie da się sparsować.
+    """
+    if isinstance(value, bool):
+        raise ValueError("Invalid number")
+    try:
+        # str() – żeby 0.1 z JSON-a nie wniosło błędów reprezentacji float
+        result = Decimal(str(value).strip().replace(",", "."))
+    except (InvalidOperation, TypeError):
+        raise ValueError("Invalid number")
+    if not result.is_finite():
+        raise ValueError("Invalid number")
+    return result
+
+
+def _qty_literal(value: Decimal):
+    return literal(value, Magazyn.Ilosc.type)
+
+
+def is_low_stock(qty, threshold) -> bool:
+    return threshold is not None and Decimal(qty) < Decimal(threshold)
+
+
+def low_stock_event(is_low: bool) -> str:
+    return EVENT_STOCK_LOW if is_low else EVENT_STOCK_RECOVERED
+
+
+def record_movements(
+    deltas: dict[int, Decimal],
+    reason: str | None = None,
+    source: str | None = None,
+    crossings: dict[int, tuple[str, Decimal]] | None = None,
+) -> None:
+    """
+    Dopisuje ruchy do dziennika Magazyn_Ruchy – jeden wielowierszowy INSERT.
+    crossings: {Magazyn_ID: (zdarzenie, ilość po ruchu)} dla pozycji, które przekroczyły próg –
+    zdarzenie trafia do tego samego wiersza (albo do wiersza z Zmiana = 0, gdy zmienił się tylko próg).
+    GET /stock/events czyta je z bazy, więc widzą je klienci każdego workera.
+    """
+    crossings = crossings or {}
+    now = local_now()
+    rows = []
+    for item_id in [*deltas, *(i for i in crossings if i not in deltas)]:
+        delta = deltas.get(item_id) or Decimal(0)
+        event_type, qty_after = crossings.get(item_id, (None, None))
+        if not delta and event_type is None:
+            continue
+        rows.append({
+            "Magazyn_ID": item_id,
+            "Zmiana": delta,
+            "Powod": reason,
+            "Zrodlo": source,
+            "Data": now,
+            "Zdarzenie": event_type,
+            "Stan_po": qty_after,
+        })
+    if rows:
+        db.session.execute(insert(MagazynRuchy), rows)
+    if crossings:
+        # tylko pobudka strumieni SSE tego procesu; pozostałe workery zobaczą wiersz przy odpytaniu bazy
+        publish_after_commit(db.session, stock_events, "wake", {})
+
+
+def last_stock_event_id(settled_before: datetime | None = None) -> int:
+    """
+    Bieżąca pozycja dziennika – kursor startowy dla nowych subskrybentów zdarzeń.
+    """
+    query = db.session.query(func.max(MagazynRuchy.ID))
+    if settled_before is not None:
+        query = query.filter(MagazynRuchy.Data <= settled_before)
+    return query.scalar() or 0
+
+
+def stock_events_after(last_id: int, limit: int = 100, settled_before: datetime | None = None) -> list[dict]:
+    """
+    Zdarzenia progów z dziennika o ID > last_id (rosnąco). ID wiersza dziennika jest
+    identyfikatorem zdarzenia – to samo dla wszystkich workerów, więc nadaje się na Last-Event-ID.
+
+    ID z autoincrement jest nadawane przy INSERT, a widoczne od commit – wiersz o niższym ID
+    może pojawić się po wyższym. Z settled_before zwracamy zdarzenia tylko do pierwszego
+    zapisanego później niż settled_before (czyli "teraz" minus margines na commit), więc
+    kursor nie przeskakuje wierszy z transakcji, które jeszcze trwają.
+    """
+    rows = (
+        db.session.query(
+            MagazynRuchy.ID,
+            MagazynRuchy.Magazyn_ID,
+            MagazynRuchy.Zdarzenie,
+            MagazynRuchy.Stan_po,
+            MagazynRuchy.Data,
+            Magazyn.Nazwa,
+            Magazyn.Prog_minimalny,
+        )
+        .outerjoin(Magazyn, Magazyn.ID == MagazynRuchy.Magazyn_ID)
+        .filter(MagazynRuchy.ID > last_id)
+        .filter(MagazynRuchy.Zdarzenie.isnot(None))
+        .order_by(MagazynRuchy.ID.asc())
+        .limit(limit)
+        .all()
+    )
+    if settled_before is not None:
+        for n, row in enumerate(rows):
+            if row.Data > settled_before:
+                rows = rows[:n]
+                break
+
+    return [
+        {
+            "Id": row.ID,
+            "Type": row.Zdarzenie,
+            "Data": {
+                "Id": row.Magazyn_ID,
+                "Name": row.Nazwa,
+                "Qty": row.Stan_po,
+                "Threshold": row.Prog_minimalny,
+                "At": row.Data,
+            },
+        }
+        for row in rows
+    ]
+
+
+def apply_stock_deltas(
+    deltas: dict[int, Decimal],
+    reason: str | None = None,
+    source: str | None = None,
+) -> dict[int, Decimal]:
+    """
+    Atomowo dodaje delty do Magazyn.Ilosc po stronie bazy:
+      UPDATE Magazyn SET Ilosc = Ilosc + CASE ID WHEN .. THEN .. END WHERE ID IN (..)
+    Bez odczytu przed zapisem – równoległe korekty (bar/kuchnia) się nie nadpisują.
+    Każda zmiana trafia też do dziennika ruchów (record_movements).
+    Zwraca nowe ilości dla pozycji, które istnieją (brakujące ID nie występują w wyniku).
+    Commit robi wywołujący.
+    """
+    deltas = {int(item_id): delta for item_id, delta in deltas.items()}
+    if not deltas:
+        return {}
+
+    changed = {item_id: delta for item_id, delta in deltas.items() if delta}
+    if changed:
+        if len(changed) == 1:
+            (item_id, delta), = changed.items()
+            increment = _qty_literal(delta)
+        else:
+            increment = case(
+                {item_id: _qty_literal(delta) for item_id, delta in changed.items()},
+                value=Magazyn.ID,
+            )
+        (Magazyn.query
+         .filter(Magazyn.ID.in_(list(changed)))
+         .update({Magazyn.Ilosc: Magazyn.Ilosc + increment}, synchronize_session=False))
+
+    # odczyt po UPDATE w tej samej transakcji – wiersze są już zablokowane przez nas
+    rows = (
+        db.session.query(Magazyn.ID, Magazyn.Ilosc, Magazyn.Prog_minimalny, Magazyn.Niski_stan)
+        .filter(Magazyn.ID.in_(list(deltas)))
+        .all()
+    )
+    new_qty = {row.ID: Decimal(row.Ilosc) for row in rows}
+
+    # flaga Niski_stan zmienia się tylko przy przekroczeniu progu – wtedy
+    # (rzadko) jeden dodatkowy UPDATE na kierunek + zdarzenie w dzienniku
+    crossed: dict[bool, list[int]] = {True: [], False: []}
+    crossings: dict[int, tuple[str, Decimal]] = {}
+    for row in rows:
+        is_low = is_low_stock(row.Ilosc, row.Prog_minimalny)
+        if is_low != bool(row.Niski_stan):
+            crossed[is_low].append(row.ID)
+            crossings[row.ID] = (low_stock_event(is_low), Decimal(row.Ilosc))
+    for is_low, item_ids in crossed.items():
+        if item_ids:
+            (Magazyn.query
+             .filter(Magazyn.ID.in_(item_ids))
+             .update({Magazyn.Niski_stan: is_low}, synchronize_session=False))
+
+    record_movements(
+        {item_id: delta for item_id, delta in changed.items() if item_id in new_qty},
+        reason=reason,
+        source=source,
+        crossings=crossings,
+    )
+    return new_qty
+
+
+def depletion_mode() -> str:
+    return str(current_app.config.get("STOCK_DEPLETION_MODE", DEPLETE_ON_ADD)).strip().lower()
+
+
+def deplete_for_portions(portions: dict[int, int], reason: str | None = None) -> dict[int, Decimal]:
+    """
+    Zdejmuje z magazynu składniki wg receptur dla {Menu_ID: liczba porcji}
+    (ujemna liczba porcji = zwrot na magazyn).
+    Jedno zapytanie o receptury + jeden zbiorczy UPDATE – wołać raz na transakcję
+    z zsumowanymi porcjami, nie per pozycja.
+    """
+    portions = {int(menu_id): qty for menu_id, qty in portions.items() if menu_id and qty}
+    if not portions:
+        return {}
+
+    deltas: dict[int, Decimal] = {}
+    for menu_id, stock_id, qty in (
+        db.session.query(Receptury.Menu_ID, Receptury.Magazyn_ID, Receptury.Ilosc)
+        .filter(Receptury.Menu_ID.in_(list(portions)))
+        .all()
+    ):
+        deltas[stock_id] = deltas.get(stock_id, Decimal(0)) - Decimal(qty) * portions[menu_id]
+
+    return apply_stock_deltas(deltas, reason=reason, source="order")
+
+
+def take_snapshot() -> datetime:
+    """
+    Migawka stanów wszystkich pozycji (INSERT ... SELECT), wołana okresowo
+    (np. cron na POST /stock/snapshots po zamknięciu dnia).
+    Zapisuje też ID ostatniego ruchu z dziennika zawartego w stanach.
+    """
+    now = local_now()
+    # zapisy stanu blokują wiersz Magazyn przed dopisaniem ruchu – po zablokowaniu
+    # wszystkich wierszy żaden ruch nie jest w toku, więc stany i max(ID) są spójne
+    db.session.query(Magazyn.ID).with_for_update().all()
+    last_move_id = db.session.query(func.coalesce(func.max(MagazynRuchy.ID), 0)).scalar()
+
+    db.session.execute(
+        insert(MagazynStany).from_select(
+            ["Magazyn_ID", "Ilosc", "Data", "Ostatni_ruch_ID"],
+            db.session.query(
+                Magazyn.ID,
+                Magazyn.Ilosc,
+                literal(now, MagazynStany.Data.type),
+                literal(int(last_move_id), MagazynStany.Ostatni_ruch_ID.type),
+            ),
+        )
+    )
+    return now
+
+
+def stock_at(moment: datetime, item_ids: list[int] | None = None) -> dict[int, Decimal] | None:
+    """
+    Stan na chwilę `moment`: najbliższa wcześniejsza migawka + suma ruchów
+    z dziennika od migawki do `moment` (bez odtwarzania całej historii).
+    Ruchy po migawce wybieramy po ID (Ostatni_ruch_ID), nie po Data – ruch z tej samej
+    sekundy co migawka nie ginie ani nie jest liczony dwa razy.
+    None, gdy przed `moment` nie ma żadnej migawki – sam dziennik nie zna stanów
+    sprzed jego założenia (migawka otwarcia: sql/upgrade.sql).
+    """
+    snapshot_at = (
+        db.session.query(func.max(MagazynStany.Data))
+        .filter(MagazynStany.Data <= moment)
+        .scalar()
+    )
+    if snapshot_at is None:
+        return None
+
+    # kilka migawek w tej samej sekundzie: po ID wygrywa ostatnia (i jej kursor)
+    last_move_id = (
+        db.session.query(func.max(MagazynStany.Ostatni_ruch_ID))
+        .filter(MagazynStany.Data == snapshot_at)
+        .scalar()
+    )
+    snap_q = (
+        db.session.query(MagazynStany.Magazyn_ID, MagazynStany.Ilosc)
+        .filter(MagazynStany.Data == snapshot_at)
+        .order_by(MagazynStany.ID)
+    )
+    if item_ids is not None:
+        snap_q = snap_q.filter(MagazynStany.Magazyn_ID.in_(item_ids))
+    result = {item_id: Decimal(qty) for item_id, qty in snap_q.all()}
+
+    moves_q = (
+        db.session.query(MagazynRuchy.Magazyn_ID, func.sum(MagazynRuchy.Zmiana))
+        .filter(MagazynRuchy.Data <= moment)
+    )
+    if last_move_id is not None:
+        moves_q = moves_q.filter(MagazynRuchy.ID > last_move_id)
+    else:
+        moves_q = moves_q.filter(MagazynRuchy.Data > snapshot_at)
+    if item_ids is not None:
+        moves_q = moves_q.filter(MagazynRuchy.Magazyn_ID.in_(item_ids))
+
+    for item_id, total in moves_q.group_by(MagazynRuchy.Magazyn_ID).all():
+        result[item_id] = result.get(item_id, Decimal(0)) + Decimal(total or 0)
+
+    return result
+
+
+def consumption_between(start: datetime, end: datetime, source: str | None = None) -> dict[int, tuple[Decimal, Decimal]]:
+    """
+    {Magazyn_ID: (zużyte, przyjęte)} w przedziale [start, end) – skan dziennika po indeksie na Data.
+    """
+    consumed = func.sum(case((MagazynRuchy.Zmiana < 0, -MagazynRuchy.Zmiana), else_=0))
+    added = func.sum(case((MagazynRuchy.Zmiana > 0, MagazynRuchy.Zmiana), else_=0))
+
+    query = (
+        db.session.query(MagazynRuchy.Magazyn_ID, consumed, added)
+        .filter(MagazynRuchy.Data >= start)
+        .filter(MagazynRuchy.Data < end)
+    )
+    if source:
+        query = query.filter(MagazynRuchy.Zrodlo == source)
+
+    return {
+        item_id: (Decimal(out or 0), Decimal(inn or 0))
+        for item_id, out, inn in query.group_by(MagazynRuchy.Magazyn_ID).all()
+    }
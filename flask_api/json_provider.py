@@ -0,0 +1,77 @@
+from datetime import date, time
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # opcjonalna zależność – bez niej zostaje stdlib
+    orjson = None
+
+# Serializacja odpowiedzi API. Handlery mogą zwracać Decimal (kolumny Numeric)
+# i date/datetime/time prosto z bazy – provider zamienia je na liczby i ISO 8601,
+# bez float()/isoformat() w każdym endpoincie.
+#
+# JSON_PROVIDER (config): "auto" (orjson, jeśli jest zainstalowany), "orjson", "stdlib".
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    # UTF-8 bez \uXXXX – te same bajty co z orjson (polskie znaki w nazwach)
+    ensure_ascii = False
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Decimal):
+            return float(o)
+        # datetime dziedziczy po date; domyślny provider Flaska dałby format HTTP (RFC 822)
+        if isinstance(o, (date, time)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+
+class OrjsonProvider(StdlibJSONProvider):
+    """
+    orjson serializuje dict/list/str/int/datetime natywnie (w C);
+    `default` woła tylko dla Decimal i typów obsługiwanych przez Flaska.
+    """
+
+    def _options(self, pretty: bool = False) -> int:
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            # niestandardowe argumenty json.dumps (np. indent) – stdlib
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # np. NaN albo liczby spoza 64 bitów – stdlib je przyjmuje
+            return super().loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(
+            obj,
+            default=self.default,
+            option=self._options(pretty) | orjson.OPT_APPEND_NEWLINE,
+        )
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app) -> None:
+    choice = str(app.config.get("JSON_PROVIDER", "auto")).strip().lower()
+    if choice == "stdlib" or orjson is None:
+        app.json = StdlibJSONProvider(app)
+    else:
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,138 @@
+import bisect
+import re
+import unicodedata
+
+# Wyszukiwarka nazw menu dla wpisywania pozycji na tablecie:
+# - prefiksy słów (posortowana lista tokenów + bisect)
+# - trigramy (literówki, brakujące polskie znaki)
+# Budowana raz na wersję menu, zapytanie to kilka odczytów ze słowników.
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+# litery, których NFKD nie rozkłada na literę bazową
+_EXTRA_FOLD = str.maketrans({"ł": "l", "ß": "ss", "æ": "ae", "ø": "o"})
+
+MIN_TRIGRAM_SIMILARITY = 0.3
+
+
+def normalize(text: str | None) -> str:
+    """
+    "Żurek  staropolski!" -> "zurek staropolski"
+    """
+    if not text:
+        return ""
+    s = str(text).lower().translate(_EXTRA_FOLD)
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", s).strip()
+
+
+def trigrams(normalized: str) -> set[str]:
+    result = set()
+    for token in normalized.split():
+        padded = f"  {token} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class MenuSearchIndex:
+    def __init__(self, items: list[dict]):
+        """
+        items: wpisy jak w GET /menu (Id, Name, Category, ...).
+        """
+        self._items: dict[int, dict] = {}
+        self._names: dict[int, str] = {}
+        self._name_grams: dict[int, set[str]] = {}
+        self._by_exact: dict[str, list[int]] = {}
+        self._grams: dict[str, set[int]] = {}
+        name_tokens: list[tuple[str, int]] = []
+        category_tokens: list[tuple[str, int]] = []
+
+        for item in items:
+            item_id = item["Id"]
+            name = normalize(item.get("Name"))
+            self._items[item_id] = item
+            self._names[item_id] = name
+            self._by_exact.setdefault(name, []).append(item_id)
+
+            grams = trigrams(name)
+            self._name_grams[item_id] = grams
+            for gram in grams:
+                self._grams.setdefault(gram, set()).add(item_id)
+
+            name_tokens.extend((token, item_id) for token in set(name.split()))
+            category_tokens.extend((token, item_id) for token in set(normalize(item.get("Category")).split()))
+
+        self._name_tokens = sorted(name_tokens)
+        self._category_tokens = sorted(category_tokens)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @staticmethod
+    def _prefix_ids(tokens: list[tuple[str, int]], prefix: str) -> set[int]:
+        ids = set()
+        i = bisect.bisect_left(tokens, (prefix,))
+        while i < len(tokens) and tokens[i][0].startswith(prefix):
+            ids.add(tokens[i][1])
+            i += 1
+        return ids
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[float, dict]]:
+        """
+        Zwraca (wynik 0-100, pozycja) malejąco po wyniku.
+        """
+        q = normalize(query)
+        if not q or limit <= 0:
+            return []
+        q_tokens = q.split()
+
+        # wszystkie słowa zapytania są prefiksami słów nazwy
+        name_match = None
+        for token in q_tokens:
+            ids = self._prefix_ids(self._name_tokens, token)
+            name_match = ids if name_match is None else name_match & ids
+
+        category_match = None
+        for token in q_tokens:
+            ids = self._prefix_ids(self._category_tokens, token)
+            category_match = ids if category_match is None else category_match & ids
+
+        # podobieństwo trigramowe (Dice) – zliczanie po listach postingowych
+        q_grams = trigrams(q)
+        shared: dict[int, int] = {}
+        for gram in q_grams:
+            for item_id in self._grams.get(gram, ()):
+                shared[item_id] = shared.get(item_id, 0) + 1
+
+        scores: dict[int, float] = {}
+        for item_id, common in shared.items():
+            similarity = 2 * common / (len(q_grams) + len(self._name_grams[item_id]))
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                scores[item_id] = 60 * similarity
+
+        for item_id in category_match or ():
+            scores[item_id] = max(scores.get(item_id, 0), 50)
+
+        for item_id in name_match or ():
+            name = self._names[item_id]
+            if name == q:
+                score = 100
+            elif name.startswith(q):
+                score = 90
+            else:
+                # krótsze nazwy (bliższe zapytaniu) wyżej
+                score = 75 + 10 * len(q) / max(len(name), 1)
+            scores[item_id] = max(scores.get(item_id, 0), score)
+
+        ranked = sorted(scores.items(), key=lambda s: (-s[1], self._names[s[0]], s[0]))
+        return [(round(score, 1), self._items[item_id]) for item_id, score in ranked[:limit]]
+
+    def resolve(self, name: str, limit: int = 5) -> tuple[dict | None, list[dict]]:
+        """
+        "Did you mean": jednoznaczne dopasowanie po normalizacji (wielkość liter,
+        polskie znaki, interpunkcja) albo lista podpowiedzi.
+        """
+        exact = self._by_exact.get(normalize(name), [])
+        if len(exact) == 1:
+            return self._items[exact[0]], []
+        return None, [item for _, item in self.search(name, limit=limit)]
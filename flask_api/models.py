@@ -140,6 +140,10 @@ class Menu(db.Model):
 
 class Zamowienia(db.Model):
     __tablename__ = "Zamowienia"
+    __table_args__ = (
+        # "najnowsze otwarte zamówienie per stolik" (GET /tables/orders)
+        db.Index("ix_Zamowienia_Stoliki_Status_Data", "Stoliki_ID", "Status", "Data"),
+    )
     ID = db.Column(db.Integer, primary_key=True)
     Data = db.Column(db.DateTime, nullable=False)
     Status = db.Column(db.String(20), nullable=False)
@@ -163,6 +167,10 @@ class Zam_Poz(db.Model):
 
 class Rezerwacje(db.Model):
     __tablename__ = "Rezerwacje"
+    __table_args__ = (
+        # zakres dat + keyset (Data, Godzina, ID) w GET /reservations
+        db.Index("ix_Rezerwacje_Data_Godzina", "Data", "Godzina"),
+    )
 
     ID = db.Column(db.Integer, primary_key=True)
 
@@ -186,3 +194,63 @@ class Magazyn(db.Model):
     Nazwa = db.Column(db.String(255), nullable=False)
     Jednostka = db.Column(db.String(50), nullable=False)
     Ilosc = db.Column(db.Numeric(12, 3), nullable=False)
+
+    # próg do zamówienia; NULL = bez alertu
+    Prog_minimalny = db.Column(db.Numeric(12, 3), nullable=True)
+    # utrzymywane przy każdej zmianie Ilosc/Prog_minimalny – GET /stock/low czyta po indeksie
+    Niski_stan = db.Column(db.Boolean, nullable=False, default=False, server_default="0", index=True)
+
+
+class MagazynRuchy(db.Model):
+    """
+    Dziennik ruchów magazynowych (tylko dopisywanie).
+    """
+    __tablename__ = "Magazyn_Ruchy"
+    __table_args__ = (
+        db.Index("ix_Magazyn_Ruchy_Magazyn_Data", "Magazyn_ID", "Data"),
+        db.Index("ix_Magazyn_Ruchy_Data", "Data"),
+        # GET /stock/events: zdarzenia po ID (kursor wspólny dla wszystkich workerów)
+        db.Index("ix_Magazyn_Ruchy_Zdarzenie_ID", "Zdarzenie", "ID"),
+    )
+
+    ID = db.Column(db.Integer, primary_key=True)
+    Magazyn_ID = db.Column(db.Integer, db.ForeignKey("Magazyn.ID"), nullable=False)
+    Zmiana = db.Column(db.Numeric(12, 3), nullable=False)
+    Powod = db.Column(db.String(255), nullable=True)
+    # np. "adjust", "order", "create", "patch", "threshold"
+    Zrodlo = db.Column(db.String(50), nullable=True)
+    Data = db.Column(db.DateTime, nullable=False)
+
+    # "StockLow" / "StockRecovered", gdy ten ruch (albo zmiana progu) przekroczył próg;
+    # Stan_po – ilość po ruchu, wypełniana tylko dla zdarzeń
+    Zdarzenie = db.Column(db.String(20), nullable=True)
+    Stan_po = db.Column(db.Numeric(12, 3), nullable=True)
+
+
+class MagazynStany(db.Model):
+    """
+    Okresowe migawki stanów – punkt startowy dla "stan na godzinę T".
+    """
+    __tablename__ = "Magazyn_Stany"
+    __table_args__ = (
+        db.Index("ix_Magazyn_Stany_Data_Magazyn", "Data", "Magazyn_ID"),
+    )
+
+    ID = db.Column(db.Integer, primary_key=True)
+    Magazyn_ID = db.Column(db.Integer, db.ForeignKey("Magazyn.ID"), nullable=False)
+    Ilosc = db.Column(db.Numeric(12, 3), nullable=False)
+    Data = db.Column(db.DateTime, nullable=False)
+    # ostatni ruch z Magazyn_Ruchy zawarty w migawce – odtwarzanie zaczyna się od ID > tej
+    # wartości (Data ma dokładność do sekundy); NULL dla starszych migawek
+    Ostatni_ruch_ID = db.Column(db.Integer, nullable=True)
+
+
+class Receptury(db.Model):
+    """
+    Receptura pozycji menu: ile danej pozycji magazynu zużywa jedna porcja.
+    """
+    __tablename__ = "Receptury"
+
+    Menu_ID = db.Column(db.Integer, db.ForeignKey("Menu.ID"), primary_key=True)
+    Magazyn_ID = db.Column(db.Integer, db.ForeignKey("Magazyn.ID"), primary_key=True)
+    Ilosc = db.Column(db.Numeric(12, 3), nullable=False)
@@ -0,0 +1,127 @@
+import threading
+import time
+
+from sqlalchemy import event
+
+from flask_api.config import engine_options
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool, QueuePool
+
+# Statystyki puli połączeń procesu (worker gunicorna):
+# - czas oczekiwania na połączenie z puli (MeteredQueuePool._do_get)
+# - liczba wypożyczeń i czas trzymania połączenia (zdarzenia checkout/checkin)
+# Odczyt: GET /api/_internal/pool.
+
+CHECKOUT_AT_KEY = "checkout_at"
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.since = time.time()
+            self.checkouts = 0
+            self.checkins = 0
+            self.waits = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.timeouts = 0
+            self.hold_total = 0.0
+            self.hold_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.waits += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def record_checkout(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+
+    def record_checkin(self, held: float | None) -> None:
+        with self._lock:
+            self.checkins += 1
+            if held is not None:
+                self.hold_total += held
+                self.hold_max = max(self.hold_max, held)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "Since": self.since,
+                "Checkouts": self.checkouts,
+                "Checkins": self.checkins,
+                "Timeouts": self.timeouts,
+                "WaitAvgMs": round(self.wait_total / self.waits * 1000, 3) if self.waits else 0.0,
+                "WaitMaxMs": round(self.wait_max * 1000, 3),
+                "HoldAvgMs": round(self.hold_total / self.checkins * 1000, 3) if self.checkins else 0.0,
+                "HoldMaxMs": round(self.hold_max * 1000, 3),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """
+    QueuePool mierzący, ile wątek czekał na wolne połączenie
+    (przy wyczerpanej puli to jest czas blokady na pool_timeout).
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return conn
+
+
+@event.listens_for(Pool, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info[CHECKOUT_AT_KEY] = time.perf_counter()
+    pool_metrics.record_checkout()
+
+
+@event.listens_for(Pool, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    started = connection_record.info.pop(CHECKOUT_AT_KEY, None)
+    pool_metrics.record_checkin(time.perf_counter() - started if started is not None else None)
+
+
+def pool_status(pool: Pool) -> dict:
+    """
+    Bieżący stan puli; pule inne niż QueuePool (np. SQLite) nie mają liczników.
+    """
+    status = {"Pool": type(pool).__name__, "Status": pool.status()}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "Size": pool.size(),
+            "CheckedIn": pool.checkedin(),
+            "CheckedOut": pool.checkedout(),
+            "Overflow": pool.overflow(),
+            "MaxOverflow": pool._max_overflow,
+            "TimeoutSeconds": pool.timeout(),
+        })
+    return status
+
+
+def init_pool_metrics(app) -> None:
+    """
+    Wołać przed db.init_app: ustawia opcje puli wg URI aplikacji (jawne
+    SQLALCHEMY_ENGINE_OPTIONS mają pierwszeństwo) i podmienia klasę puli na
+    MeteredQueuePool (tylko dla baz z QueuePool – SQLite zostaje przy domyślnej puli).
+    """
+    uri = str(app.config.get("SQLALCHEMY_DATABASE_URI", ""))
+    options = {**engine_options(uri), **(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})}
+    if not uri.startswith("sqlite"):
+        options.setdefault("poolclass", MeteredQueuePool)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
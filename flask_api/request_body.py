@@ -0,0 +1,81 @@
+import zlib
+
+from flask import current_app, request
+
+try:
+    import msgpack
+except ImportError:  # opcjonalna zależność – bez niej tylko JSON
+    msgpack = None
+
+# Wspólne dekodowanie body dla dużych pushy (/…/sync):
+# - Content-Encoding: gzip (z limitem rozmiaru po rozpakowaniu – ochrona przed "zip bomb")
+# - Content-Type: application/msgpack albo JSON (domyślnie)
+# Błędy zgłaszamy jako PayloadError -> {"error": ...} z odpowiednim kodem (handler w api_bp).
+
+DEFAULT_MAX_DECOMPRESSED_BYTES = 50 * 1024 * 1024
+
+MSGPACK_MIMETYPES = {"application/msgpack", "application/x-msgpack", "application/vnd.msgpack"}
+
+
+def _reject_ext(code: int, data: bytes):
+    # typy rozszerzeń nie mają odpowiednika w JSON – handlery by się na nich wywróciły
+    raise ValueError(f"Unsupported MessagePack extension type {code}")
+
+
+class PayloadError(Exception):
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def _max_decompressed_bytes() -> int:
+    return int(current_app.config.get("REQUEST_MAX_DECOMPRESSED_BYTES", DEFAULT_MAX_DECOMPRESSED_BYTES))
+
+
+def _gunzip(raw: bytes, limit: int) -> bytes:
+    """
+    Rozpakowuje co najwyżej limit + 1 bajtów – większe body nie trafia w całości do pamięci.
+    """
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        data = d.decompress(raw, limit + 1)
+    except zlib.error:
+        raise PayloadError("Invalid gzip body")
+    if len(data) > limit:
+        raise PayloadError(f"Body too large after decompression. Limit={limit} bytes", 413)
+    if not d.eof:
+        raise PayloadError("Truncated gzip body")
+    return data
+
+
+def get_payload(default=None):
+    """
+    Zdekodowane body żądania (JSON albo MessagePack, opcjonalnie gzip).
+    Puste body -> default. Niepoprawne body -> PayloadError (400/413/415),
+    a nie cicha pusta lista jak przy request.get_json(silent=True).
+    """
+    raw = request.get_data(cache=True)
+
+    encoding = (request.headers.get("Content-Encoding") or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        raw = _gunzip(raw, _max_decompressed_bytes())
+    elif encoding not in ("", "identity"):
+        raise PayloadError(f"Unsupported Content-Encoding: {encoding}", 415)
+
+    if not raw:
+        return default
+
+    if request.mimetype in MSGPACK_MIMETYPES:
+        if msgpack is None:
+            raise PayloadError("MessagePack is not supported on this server", 415)
+        try:
+            return msgpack.unpackb(raw, raw=False, strict_map_key=False, ext_hook=_reject_ext)
+        except (ValueError, TypeError, OverflowError, msgpack.UnpackException):
+            # TypeError: np. tablica jako klucz mapy (unhashable)
+            raise PayloadError("Invalid MessagePack body")
+
+    try:
+        return current_app.json.loads(raw)
+    except ValueError:
+        raise PayloadError("Invalid JSON body")
@@ -0,0 +1,130 @@
+import bisect
+from datetime import time
+
+from flask_api.settings_cache import CLOSE_TO, OPEN_FROM, RESERVATION_INTERVAL, get_settings
+
+# Plan dnia rezerwacji: dla każdego stolika posortowana lista godzin rozpoczęcia
+# (w minutach od północy). Rezerwacja zajmuje stolik na [start, start + odstęp),
+# więc nowa rezerwacja w `s` koliduje, jeśli istnieje start w (s - odstęp, s + odstęp)
+# – jedno bisect na sprawdzenie, a wolne sloty całego dnia to jeden przebieg (sweep).
+
+# gdy Odstep_miedzy_rezerwacjami = 0 / brak
+DEFAULT_INTERVAL_MINUTES = 120
+DEFAULT_OPEN = time(10, 0)
+DEFAULT_CLOSE = time(22, 0)
+DEFAULT_STEP_MINUTES = 15
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minutes(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def format_minutes(minutes: int) -> str:
+    minutes %= MINUTES_PER_DAY
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def load_policy() -> tuple[int, int, int]:
+    """
+    (odstęp, otwarcie, zamknięcie) w minutach – z cache ustawień.
+    Zamknięcie po północy (np. 02:00) liczymy jako kolejną dobę.
+    """
+    settings = get_settings()
+    interval = settings.get_int(RESERVATION_INTERVAL, 0)
+    if interval <= 0:
+        interval = DEFAULT_INTERVAL_MINUTES
+
+    open_min = to_minutes(settings.get_time(OPEN_FROM, DEFAULT_OPEN))
+    close_min = to_minutes(settings.get_time(CLOSE_TO, DEFAULT_CLOSE))
+    if close_min <= open_min:
+        close_min += MINUTES_PER_DAY
+    return interval, open_min, close_min
+
+
+class TableSchedule:
+    __slots__ = ("table_id", "seats", "starts")
+
+    def __init__(self, table_id: int, seats: int):
+        self.table_id = table_id
+        self.seats = seats
+        self.starts: list[int] = []
+
+    def conflicts(self, start: int, interval: int) -> bool:
+        i = bisect.bisect_right(self.starts, start - interval)
+        return i < len(self.starts) and self.starts[i] < start + interval
+
+    def book(self, start: int) -> None:
+        bisect.insort(self.starts, start)
+
+    def free_starts(self, first: int, last: int, step: int, interval: int) -> list[int]:
+        """
+        Godziny z [first, last] co `step`, o których można zacząć rezerwację.
+        Wskaźnik po `starts` idzie tylko do przodu: O(slotów + rezerwacji).
+        """
+        result = []
+        starts = self.starts
+        j = 0
+        for s in range(first, last + 1, step):
+            while j < len(starts) and starts[j] <= s - interval:
+                j += 1
+            if j == len(starts) or starts[j] >= s + interval:
+                result.append(s)
+        return result
+
+
+class DayPlan:
+    def __init__(self, tables, reservations, interval: int, open_min: int, close_min: int):
+        """
+        tables: [(Stoliki.ID, Ile_osob)], reservations: [(Stoliki_ID, Godzina)].
+        Rezerwacje na nieznanych stolikach są pomijane.
+        """
+        self.interval = interval
+        self.open_min = open_min
+        self.close_min = close_min
+
+        # rosnąco po liczbie miejsc – best-fit to pierwszy pasujący wolny stolik
+        self.schedules = sorted(
+            (TableSchedule(table_id, seats or 0) for table_id, seats in tables),
+            key=lambda s: (s.seats, s.table_id),
+        )
+        self._seats = [s.seats for s in self.schedules]
+        self._by_id = {s.table_id: s for s in self.schedules}
+
+        for table_id, start in reservations:
+            schedule = self._by_id.get(table_id)
+            if schedule is not None and start is not None:
+                schedule.book(self.minute_of(start))
+
+    @property
+    def last_start(self) -> int:
+        # rezerwacja musi się skończyć przed zamknięciem
+        return self.close_min - self.interval
+
+    def minute_of(self, t: time) -> int:
+        minutes = to_minutes(t)
+        # godziny po północy należą do tego samego "dnia pracy"
+        if self.close_min > MINUTES_PER_DAY and minutes < self.open_min:
+            minutes += MINUTES_PER_DAY
+        return minutes
+
+    def fitting(self, people: int) -> list[TableSchedule]:
+        return self.schedules[bisect.bisect_left(self._seats, people):]
+
+    def available(self, people: int, step: int = DEFAULT_STEP_MINUTES) -> list[tuple[TableSchedule, list[int]]]:
+        result = []
+        for schedule in self.fitting(people):
+            slots = schedule.free_starts(self.open_min, self.last_start, step, self.interval)
+            if slots:
+                result.append((schedule, slots))
+        return result
+
+    def best_table(self, people: int, start: int) -> TableSchedule | None:
+        """
+        Najmniejszy wolny stolik z wystarczającą liczbą miejsc.
+        """
+        for schedule in self.fitting(people):
+            if not schedule.conflicts(start, self.interval):
+                return schedule
+        return None
@@ -0,0 +1,165 @@
+import threading
+import time as monotonic_clock
+from datetime import datetime, time
+
+from flask import current_app
+
+from flask_api.cache import bump_version, get_or_build
+from flask_api.extensions import db
+from flask_api.models import Ustawienia
+
+# Ustawienia (key/value) wczytane jednym zapytaniem i sparsowane wg kolumny Typ.
+# Odczyty w endpointach to słowniki w pamięci; zapisy podbijają wersję w bazie
+# (wiersz SETTINGS_VERSION_KEY) w tej samej transakcji i wołają invalidate_settings()
+# po commit. Inne workery sprawdzają wersję z bazy (jedno zapytanie po unikalnym kluczu)
+# najwyżej co SETTINGS_REVALIDATE_SECONDS i przeładowują ustawienia, gdy się zmieniła.
+
+SETTINGS_CACHE = "settings"
+SETTINGS_VERSION_KEY = "_settings_version"
+DEFAULT_REVALIDATE_SECONDS = 1.0
+
+REQUIRE_APPROVAL = "Zatwierdzanie_Rezerwacji"
+RESERVATION_INTERVAL = "Odstep_miedzy_rezerwacjami"
+OPEN_FROM = "godziny_otwarcia_od"
+CLOSE_TO = "godziny_zamkniecia_od"
+
+RESERVATION_KEYS = (REQUIRE_APPROVAL, RESERVATION_INTERVAL, OPEN_FROM, CLOSE_TO)
+
+
+def parse_bool(v: str | None) -> bool:
+    if v is None:
+        return False
+    return str(v).strip().lower() in ("1", "true", "yes", "y", "tak")
+
+
+def parse_int(v: str | None, default: int | None = 0) -> int | None:
+    try:
+        return int(str(v).strip())
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_time(v: str | None) -> time | None:
+    """
+    "10:00" / "10:00:00" -> time, inaczej None.
+    """
+    s = str(v or "").strip()
+    for fmt in ("%H:%M", "%H:%M:%S"):
+        try:
+            return datetime.strptime(s, fmt).time()
+        except ValueError:
+            pass
+    return None
+
+
+_PARSERS = {
+    "bool": parse_bool,
+    "int": lambda v: parse_int(v, None),
+    "time": parse_time,
+}
+
+
+class SettingsSnapshot:
+    def __init__(self, rows: list[Ustawienia]):
+        self.entries = [
+            {
+                "Id": s.ID,
+                "Name": s.Nazwa_opcji,
+                "Value": s.Wartosc,
+                "Type": s.Typ,
+                "Description": s.Opis,
+            }
+            for s in rows
+        ]
+        self._raw = {s.Nazwa_opcji: s.Wartosc for s in rows}
+        self._typed = {
+            s.Nazwa_opcji: _PARSERS.get((s.Typ or "").strip().lower(), str)(s.Wartosc)
+            for s in rows
+        }
+
+    def raw(self, name: str, default: str | None = None) -> str | None:
+        return self._raw.get(name, default)
+
+    def get(self, name: str, default=None):
+        """
+        Wartość sparsowana wg Typ (bool/int/time), dla pozostałych typów tekst.
+        """
+        value = self._typed.get(name)
+        return default if value is None else value
+
+    # wiersze zapisane przez PATCH /settings/bulk mogą nie mieć Typ –
+    # wtedy parsujemy surowy tekst
+
+    def get_bool(self, name: str, default: bool = False) -> bool:
+        value = self._typed.get(name)
+        if isinstance(value, bool):
+            return value
+        return parse_bool(value) if name in self._raw else default
+
+    def get_int(self, name: str, default: int = 0) -> int:
+        value = self._typed.get(name)
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        return parse_int(self._raw.get(name), default)
+
+    def get_time(self, name: str, default: time | None = None) -> time | None:
+        value = self._typed.get(name)
+        if isinstance(value, time):
+            return value
+        return parse_time(self._raw.get(name)) or default
+
+
+_lock = threading.Lock()
+# (wersja z bazy, chwila sprawdzenia wg time.monotonic)
+_checked: tuple[int | None, float] = (None, 0.0)
+
+
+def _load_settings() -> SettingsSnapshot:
+    rows = (
+        Ustawienia.query
+        .filter(Ustawienia.Nazwa_opcji != SETTINGS_VERSION_KEY)
+        .order_by(Ustawienia.ID)
+        .all()
+    )
+    return SettingsSnapshot(rows)
+
+
+def stored_version() -> int:
+    value = (
+        db.session.query(Ustawienia.Wartosc)
+        .filter(Ustawienia.Nazwa_opcji == SETTINGS_VERSION_KEY)
+        .scalar()
+    )
+    return parse_int(value, 0)
+
+
+def _revalidate() -> None:
+    global _checked
+    interval = float(current_app.config.get("SETTINGS_REVALIDATE_SECONDS", DEFAULT_REVALIDATE_SECONDS))
+    now = monotonic_clock.monotonic()
+    with _lock:
+        known, checked_at = _checked
+        if known is not None and now - checked_at < interval:
+            return
+
+    version = stored_version()
+    with _lock:
+        known = _checked[0]
+        _checked = (version, now)
+    if known is not None and version != known:
+        bump_version(SETTINGS_CACHE)
+
+
+def get_settings() -> SettingsSnapshot:
+    _revalidate()
+    return get_or_build(SETTINGS_CACHE, "all", _load_settings)
+
+
+def invalidate_settings(version: int | None = None) -> None:
+    """
+    Wołać po commit zmian w Ustawienia (z wersją zapisaną w tej transakcji).
+    """
+    global _checked
+    with _lock:
+        _checked = (version, monotonic_clock.monotonic())
+    bump_version(SETTINGS_CACHE)
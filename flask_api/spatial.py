@@ -0,0 +1,139 @@
+import math
+
+from flask_api.utils import DEFAULT_HEIGHT, DEFAULT_WIDTH
+
+# Rozmiar komórki siatki w jednostkach mapy (X_Pos/Y_Pos).
+# Kilka stolików na komórkę = krótkie listy do sprawdzenia.
+DEFAULT_CELL_SIZE = 400
+
+
+def table_bbox(table: dict) -> tuple[float, float, float, float]:
+    """
+    Prostokąt (x1, y1, x2, y2) zajmowany przez stolik na mapie.
+    X/Y to lewy górny róg, obrót liczymy wokół środka stolika.
+    """
+    angle = math.radians(table.get("Rotation") or 0)
+    cos_a = abs(math.cos(angle))
+    sin_a = abs(math.sin(angle))
+    width = DEFAULT_WIDTH * cos_a + DEFAULT_HEIGHT * sin_a
+    height = DEFAULT_WIDTH * sin_a + DEFAULT_HEIGHT * cos_a
+
+    cx, cy = table_center(table)
+    return cx - width / 2, cy - height / 2, cx + width / 2, cy + height / 2
+
+
+def table_center(table: dict) -> tuple[float, float]:
+    return table["X"] + DEFAULT_WIDTH / 2, table["Y"] + DEFAULT_HEIGHT / 2
+
+
+class TableGrid:
+    """
+    Siatka (uniform grid) stolików jednego poziomu.
+    - query_rect: stoliki przecinające prostokąt (viewport)
+    - nearest: najbliższe stoliki spełniające warunek (po środku stolika)
+    Budowana raz na wersję mapy, potem tylko odczyty.
+    """
+
+    def __init__(self, tables: list[dict], cell_size: int = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._boxes: dict[int, tuple[float, float, float, float]] = {}
+        self._cells: dict[tuple[int, int], list[dict]] = {}
+        self._centers: dict[tuple[int, int], list[tuple[float, float, dict]]] = {}
+
+        for table in tables:
+            box = table_bbox(table)
+            self._boxes[table["Id"]] = box
+
+            x1, y1 = self._cell(box[0], box[1])
+            x2, y2 = self._cell(box[2], box[3])
+            for cx in range(x1, x2 + 1):
+                for cy in range(y1, y2 + 1):
+                    self._cells.setdefault((cx, cy), []).append(table)
+
+            px, py = table_center(table)
+            self._centers.setdefault(self._cell(px, py), []).append((px, py, table))
+
+        if self._centers:
+            xs = [c[0] for c in self._centers]
+            ys = [c[1] for c in self._centers]
+            self._bounds = (min(xs), min(ys), max(xs), max(ys))
+        else:
+            self._bounds = None
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def _cell(self, x: float, y: float) -> tuple[int, int]:
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def query_rect(self, x1: float, y1: float, x2: float, y2: float) -> list[dict]:
+        if x1 > x2:
+            x1, x2 = x2, x1
+        if y1 > y2:
+            y1, y2 = y2, y1
+
+        cx1, cy1 = self._cell(x1, y1)
+        cx2, cy2 = self._cell(x2, y2)
+
+        found: dict[int, dict] = {}
+        # przy ogromnym viewporcie taniej przejść po niepustych komórkach
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self._cells):
+            cells = (tables for (cx, cy), tables in self._cells.items()
+                     if cx1 <= cx <= cx2 and cy1 <= cy <= cy2)
+        else:
+            cells = (self._cells.get((cx, cy), ())
+                     for cx in range(cx1, cx2 + 1)
+                     for cy in range(cy1, cy2 + 1))
+
+        for tables in cells:
+            for table in tables:
+                if table["Id"] in found:
+                    continue
+                bx1, by1, bx2, by2 = self._boxes[table["Id"]]
+                if bx1 <= x2 and bx2 >= x1 and by1 <= y2 and by2 >= y1:
+                    found[table["Id"]] = table
+
+        return sorted(found.values(), key=lambda t: t["Id"])
+
+    def nearest(self, x: float, y: float, predicate=None, limit: int = 1) -> list[tuple[float, dict]]:
+        """
+        Zwraca do `limit` par (odległość, stolik), rosnąco po odległości.
+        Przeszukuje pierścienie komórek wokół punktu i kończy, gdy kolejny
+        pierścień nie może już dać bliższego wyniku.
+        """
+        if self._bounds is None or limit <= 0:
+            return []
+
+        qx, qy = self._cell(x, y)
+        min_x, min_y, max_x, max_y = self._bounds
+        max_ring = max(abs(qx - min_x), abs(qx - max_x), abs(qy - min_y), abs(qy - max_y))
+
+        best: list[tuple[float, int, dict]] = []
+        for ring in range(max_ring + 1):
+            for cell in self._ring(qx, qy, ring):
+                for px, py, table in self._centers.get(cell, ()):
+                    if predicate is not None and not predicate(table):
+                        continue
+                    best.append((math.hypot(px - x, py - y), table["Id"], table))
+
+            if len(best) >= limit:
+                best.sort(key=lambda b: (b[0], b[1]))
+                del best[limit:]
+                # każdy punkt z następnego pierścienia jest dalej niż ring * cell_size
+                if best[-1][0] <= ring * self.cell_size:
+                    break
+
+        best.sort(key=lambda b: (b[0], b[1]))
+        return [(dist, table) for dist, _, table in best[:limit]]
+
+    @staticmethod
+    def _ring(qx: int, qy: int, ring: int):
+        if ring == 0:
+            yield qx, qy
+            return
+        for cx in range(qx - ring, qx + ring + 1):
+            yield cx, qy - ring
+            yield cx, qy + ring
+        for cy in range(qy - ring + 1, qy + ring):
+            yield qx - ring, cy
+            yield qx + ring, cy
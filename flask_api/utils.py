@@ -1,10 +1,16 @@
 from datetime import datetime
+from zoneinfo import ZoneInfo
 
 from flask_api.extensions import db
 from flask_api.models import Stoliki
 
 DEFAULT_WIDTH = 80
 DEFAULT_HEIGHT = 160
+
+LOCAL_TZ = ZoneInfo("Europe/Warsaw")
+
+# wartości Zam_Poz.Wydane oznaczające pozycję wydaną (także do filtrów w SQL)
+WYDANE_TRUE = ("Y", "T", "1")
 
 
 def bool_from_status(status: str) -> bool:
@@ -17,9 +23,53 @@ def bool_from_status(status: str) -> bool:
 def bool_from_wydane(flag: str) -> bool:
     if not flag:
         return False
-    return str(flag).upper() in ("Y", "T", "1")
+    return str(flag).upper() in WYDANE_TRUE
+
+
+def local_now() -> datetime:
+    """Aktualny czas lokalny restauracji (naive, tak jak zapisujemy w bazie)."""
+    return datetime.now(LOCAL_TZ).replace(tzinfo=None)
 
 
+def order_to_json(zam, rows) -> dict:
+    """
+    Zamówienie z pozycjami w formacie GET /tables/<id>/order.
+    rows: lista (Zam_Poz, Menu) należących do zamówienia.
+    """
+    items = []
+    any_items = False
+    all_served = True
+
+    for poz, menu in rows:
+        any_items = True
+        served = bool_from_wydane(poz.Wydane)
+        if not served:
+            all_served = False
+
+        items.append({
+            "ItemId": poz.ID,
+            "MenuId": menu.ID,
+            "Name": menu.Nazwa,
+            "Qty": int(poz.Ilosc),
+            "IsServed": served,
+            # opcjonalnie (przydatne w UI/rachunku):
+            "Price": menu.Cena if menu.Cena is not None else 0.0,
+            "LineTotal": (menu.Cena * int(poz.Ilosc)) if menu.Cena is not None else 0.0,
+        })
+
+    return {
+        "OrderId": zam.ID,
+        "TableId": zam.Stoliki_ID,
+        "WaiterId": zam.Kelnerzy_ID,
+        "Items": items,
+        "IsServed": (all_served if any_items else False),
+        "IsSettled": bool_from_status(zam.Status),
+        "CreatedAt": zam.Data,
+        "Notes": zam.Uwagi,
+        "Status": zam.Status,
+    }
+
+
 def parse_iso_datetime(value):
     if not value:
         return datetime.utcnow()
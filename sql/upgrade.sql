@@ -0,0 +1,59 @@
+-- Zmiany schematu bazy (MySQL/MariaDB) wymagane przez kolejne wersje API.
+-- Aplikacja nie tworzy ani nie zmienia tabel sama (create_all tylko w testach) –
+-- sekcje uruchamiać po kolei, przed wdrożeniem kodu, który z nich korzysta.
+
+-- GET /tables/orders: najnowsze otwarte zamówienie per stolik
+CREATE INDEX `ix_Zamowienia_Stoliki_Status_Data` ON `Zamowienia` (`Stoliki_ID`, `Status`, `Data`);
+
+-- Receptury pozycji menu (zejście magazynu przy zamówieniach)
+CREATE TABLE `Receptury` (
+    `Menu_ID` INTEGER NOT NULL,
+    `Magazyn_ID` INTEGER NOT NULL,
+    `Ilosc` NUMERIC(12, 3) NOT NULL,
+    PRIMARY KEY (`Menu_ID`, `Magazyn_ID`),
+    FOREIGN KEY (`Menu_ID`) REFERENCES `Menu` (`ID`),
+    FOREIGN KEY (`Magazyn_ID`) REFERENCES `Magazyn` (`ID`)
+);
+
+-- Dziennik ruchów magazynowych i migawki stanów ("stan na godzinę T")
+CREATE TABLE `Magazyn_Ruchy` (
+    `ID` INTEGER NOT NULL AUTO_INCREMENT,
+    `Magazyn_ID` INTEGER NOT NULL,
+    `Zmiana` NUMERIC(12, 3) NOT NULL,
+    `Powod` VARCHAR(255),
+    `Zrodlo` VARCHAR(50),
+    `Data` DATETIME NOT NULL,
+    PRIMARY KEY (`ID`),
+    FOREIGN KEY (`Magazyn_ID`) REFERENCES `Magazyn` (`ID`)
+);
+CREATE INDEX `ix_Magazyn_Ruchy_Magazyn_Data` ON `Magazyn_Ruchy` (`Magazyn_ID`, `Data`);
+CREATE INDEX `ix_Magazyn_Ruchy_Data` ON `Magazyn_Ruchy` (`Data`);
+
+CREATE TABLE `Magazyn_Stany` (
+    `ID` INTEGER NOT NULL AUTO_INCREMENT,
+    `Magazyn_ID` INTEGER NOT NULL,
+    `Ilosc` NUMERIC(12, 3) NOT NULL,
+    `Data` DATETIME NOT NULL,
+    `Ostatni_ruch_ID` INTEGER,
+    PRIMARY KEY (`ID`),
+    FOREIGN KEY (`Magazyn_ID`) REFERENCES `Magazyn` (`ID`)
+);
+CREATE INDEX `ix_Magazyn_Stany_Data_Magazyn` ON `Magazyn_Stany` (`Data`, `Magazyn_ID`);
+
+-- migawka otwarcia: stany sprzed dziennika; /stock/at dla wcześniejszych chwil zwraca 409
+INSERT INTO `Magazyn_Stany` (`Magazyn_ID`, `Ilosc`, `Data`, `Ostatni_ruch_ID`)
+SELECT `ID`, `Ilosc`, NOW(), 0 FROM `Magazyn`;
+
+-- Progi minimalne i zdarzenia niskiego stanu (GET /stock/low, GET /stock/events)
+ALTER TABLE `Magazyn`
+    ADD COLUMN `Prog_minimalny` NUMERIC(12, 3) NULL,
+    ADD COLUMN `Niski_stan` BOOL NOT NULL DEFAULT 0;
+CREATE INDEX `ix_Magazyn_Niski_stan` ON `Magazyn` (`Niski_stan`);
+
+ALTER TABLE `Magazyn_Ruchy`
+    ADD COLUMN `Zdarzenie` VARCHAR(20) NULL,
+    ADD COLUMN `Stan_po` NUMERIC(12, 3) NULL;
+CREATE INDEX `ix_Magazyn_Ruchy_Zdarzenie_ID` ON `Magazyn_Ruchy` (`Zdarzenie`, `ID`);
+
+-- GET /reservations: zakres dat + keyset (Data, Godzina, ID)
+CREATE INDEX `ix_Rezerwacje_Data_Godzina` ON `Rezerwacje` (`Data`, `Godzina`);
@@ -0,0 +1,15 @@
+import os
+
+import pytest
+
+# Config czyta DATABASE_URL przy imporcie – testy nie potrzebują MySQL
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from flask_api import create_app  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
@@ -0,0 +1,70 @@
+import gzip
+import json
+
+import pytest
+from flask import Response, jsonify
+
+from flask_api.auth import create_access_token
+from flask_api.extensions import db
+from flask_api.models import Menu
+
+BIG = [{"Id": i, "Name": f"Pozycja {i}"} for i in range(200)]
+
+
+@pytest.fixture
+def client(app):
+    app.config["COMPRESS_MIN_SIZE"] = 1024
+
+    @app.get("/_test/big")
+    def big():
+        return jsonify(BIG)
+
+    @app.get("/_test/small")
+    def small():
+        return jsonify({"status": "ok"})
+
+    @app.get("/_test/stream")
+    def stream():
+        return Response((b"x" * 2048 for _ in range(2)), mimetype="text/plain")
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(Menu(ID=1, Nazwa="Pierogi ruskie", Typ="Dania", Cena=20, Opis=""))
+        db.session.commit()
+        token = create_access_token(1, "test")
+
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    return client
+
+
+@pytest.mark.parametrize("accept, compressed", [("gzip", True), ("*", True), ("gzip;q=0", False), ("", False)])
+def test_negotiation(client, accept, compressed):
+    response = client.get("/_test/big", headers={"Accept-Encoding": accept})
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert (response.headers.get("Content-Encoding") == "gzip") is compressed
+    body = gzip.decompress(response.data) if compressed else response.data
+    assert json.loads(body) == BIG
+
+
+def test_small_response_is_not_compressed(client):
+    response = client.get("/_test/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_stream_is_not_compressed(client):
+    response = client.get("/_test/stream", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.data == b"x" * 4096
+
+
+def test_menu_304_keeps_weak_etag(client):
+    # /menu jest duże dopiero przy realnym menu – próg 0, żeby 200 było skompresowane
+    client.application.config["COMPRESS_MIN_SIZE"] = 0
+    first = client.get("/api/menu", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert first.headers["ETag"].startswith('W/"')
+
+    again = client.get("/api/menu", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
@@ -0,0 +1,28 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from flask_api.json_provider import OrjsonProvider, StdlibJSONProvider, orjson
+
+PAYLOADS = [
+    {"Name": "Żurek zaczęty", "Price": Decimal("20.50")},
+    [{"OrderId": 1, "CreatedAt": datetime(2026, 1, 10, 12, 30), "Items": [], "Notes": "bez cebuli"}],
+]
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson not installed")
+@pytest.mark.parametrize("payload", PAYLOADS)
+@pytest.mark.parametrize("debug", [False, True])
+def test_orjson_and_stdlib_give_same_bytes(app, payload, debug):
+    app.debug = debug
+    with app.app_context():
+        fast = OrjsonProvider(app).response(payload).get_data()
+        slow = StdlibJSONProvider(app).response(payload).get_data()
+    assert fast == slow
+
+
+def test_stdlib_keeps_polish_characters(app):
+    with app.app_context():
+        body = StdlibJSONProvider(app).response({"Name": "Żurek"}).get_data()
+    assert body == '{"Name":"Żurek"}\n'.encode()
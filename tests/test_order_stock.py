@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+import pytest
+
+from flask_api.auth import create_access_token
+from flask_api.extensions import db
+from flask_api.models import Magazyn, Menu, Receptury, Zamowienia, Zam_Poz
+
+
+@pytest.fixture
+def client(app):
+    app.config["STOCK_DEPLETION_MODE"] = "add"
+    with app.app_context():
+        db.create_all()
+        db.session.add(Menu(ID=1, Nazwa="Pierogi ruskie", Typ="Dania", Cena=20, Opis=""))
+        db.session.add(Magazyn(ID=1, Nazwa="Mąka", Jednostka="kg", Ilosc=10, Niski_stan=False))
+        db.session.add(Receptury(Menu_ID=1, Magazyn_ID=1, Ilosc=Decimal("0.5")))
+        db.session.commit()
+        token = create_access_token(1, "test")
+
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    return client
+
+
+def _order(client, app, qty: int, served: bool = False, status: str = "open") -> int:
+    order_id = client.post("/api/orders", json={"TableId": 1, "WaiterId": 1, "Items": [{"MenuId": 1, "Qty": qty}]}).get_json()["OrderId"]
+    with app.app_context():
+        db.session.get(Zamowienia, order_id).Status = status
+        Zam_Poz.query.filter_by(Zamowienia_ID=order_id).update({"Wydane": "Y" if served else "N"})
+        db.session.commit()
+    return order_id
+
+
+def _stock(app) -> Decimal:
+    with app.app_context():
+        return db.session.get(Magazyn, 1).Ilosc
+
+
+def test_deleting_open_order_returns_unserved_portions(client, app):
+    order_id = _order(client, app, qty=4)
+    assert _stock(app) == Decimal("8")
+
+    assert client.delete(f"/api/orders/{order_id}").status_code == 200
+    assert _stock(app) == Decimal("10")
+
+
+def test_deleting_served_item_keeps_stock(client, app):
+    order_id = _order(client, app, qty=4, served=True)
+    with app.app_context():
+        item_id = Zam_Poz.query.filter_by(Zamowienia_ID=order_id).first().ID
+
+    assert client.delete(f"/api/orders/{order_id}/items/{item_id}").status_code == 200
+    assert _stock(app) == Decimal("8")
+
+
+def test_deleting_settled_order_keeps_stock(client, app):
+    order_id = _order(client, app, qty=4, status="paid")
+
+    assert client.delete(f"/api/orders/{order_id}").status_code == 200
+    assert _stock(app) == Decimal("8")
@@ -0,0 +1,67 @@
+import gzip
+
+import pytest
+
+from flask_api.request_body import PayloadError, get_payload, msgpack
+
+needs_msgpack = pytest.mark.skipif(msgpack is None, reason="msgpack not installed")
+
+
+def _decode(app, data: bytes, content_type: str = "application/json", **headers):
+    with app.test_request_context("/", method="POST", data=data, content_type=content_type, headers=headers):
+        return get_payload([])
+
+
+def test_json_and_empty_body(app):
+    assert _decode(app, b'[{"Id": 1}]') == [{"Id": 1}]
+    assert _decode(app, b"") == []
+
+
+def test_gzip_body(app):
+    assert _decode(app, gzip.compress(b'[{"Id": 1}]'), **{"Content-Encoding": "gzip"}) == [{"Id": 1}]
+
+
+def test_gzip_over_limit(app):
+    app.config["REQUEST_MAX_DECOMPRESSED_BYTES"] = 100
+    with pytest.raises(PayloadError) as err:
+        _decode(app, gzip.compress(b"[" + b" " * 1000 + b"]"), **{"Content-Encoding": "gzip"})
+    assert err.value.status_code == 413
+
+
+def test_invalid_json(app):
+    with pytest.raises(PayloadError) as err:
+        _decode(app, b"{bad")
+    assert err.value.status_code == 400
+
+
+@needs_msgpack
+def test_msgpack_body(app):
+    assert _decode(app, msgpack.packb([{"Id": 1}]), "application/msgpack") == [{"Id": 1}]
+
+
+@needs_msgpack
+@pytest.mark.parametrize("body", [
+    b"\x81\x91\x01\x01",  # mapa z tablicą jako kluczem
+    b"\xc1",              # niedozwolony bajt
+    b"\x92\x01",          # ucięta tablica
+    b"\xc7\x01\x05a",     # typ rozszerzenia
+])
+def test_malformed_msgpack(app, body):
+    with pytest.raises(PayloadError) as err:
+        _decode(app, body, "application/msgpack")
+    assert err.value.status_code == 400
+
+
+@needs_msgpack
+def test_malformed_msgpack_map_key_returns_400(app):
+    with app.test_request_context():
+        from flask_api.auth import create_access_token
+        token = create_access_token(1, "test")
+    response = app.test_client().post(
+        "/api/reservations/sync",
+        data=b"\x81\x91\x01\x01",
+        content_type="application/msgpack",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid MessagePack body"}
@@ -0,0 +1,43 @@
+from datetime import datetime
+from unittest import mock
+
+import pytest
+
+from flask_api.auth import create_access_token
+from flask_api.extensions import db
+from flask_api.models import Magazyn
+
+NOW = datetime(2026, 1, 10, 12, 0, 0)
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        db.create_all()
+        # pozycja sprzed dziennika ruchów – bez ruchu "Stan początkowy"
+        db.session.add(Magazyn(ID=1, Nazwa="Mąka", Jednostka="kg", Ilosc=10, Niski_stan=False))
+        db.session.commit()
+        token = create_access_token(1, "test")
+
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    return client
+
+
+def _qty_at(client, moment: str):
+    response = client.get(f"/api/stock/at?time={moment}")
+    return response.status_code, [item["Qty"] for item in (response.get_json().get("Items") or [])]
+
+
+def test_before_first_snapshot_is_conflict(client):
+    status, _ = _qty_at(client, "2026-01-10T12:00:00")
+    assert status == 409
+
+
+def test_movement_in_snapshot_second_is_counted_once(client):
+    with mock.patch("flask_api.inventory.local_now", return_value=NOW):
+        assert client.post("/api/stock/snapshots").status_code == 201
+        assert client.post("/api/stock/1/adjust", json={"Delta": -2}).status_code == 200
+
+    assert _qty_at(client, "2026-01-10T12:00:00") == (200, [8.0])
+    assert _qty_at(client, "2026-01-10T11:59:59") == (409, [])
@@ -0,0 +1,50 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+
+from flask_api.auth import create_access_token
+from flask_api.extensions import db
+from flask_api.inventory import stock_events_after
+from flask_api.models import Magazyn, MagazynRuchy
+from flask_api.utils import local_now
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        db.create_all()
+        token = create_access_token(1, "test")
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    return client
+
+
+def _events(client, since: int, now=None):
+    with mock.patch("flask_api.api.stock.local_now", return_value=now or local_now()):
+        return client.get(f"/api/stock/events?format=json&since={since}").get_json()
+
+
+def test_events_wait_for_commit_lag(client):
+    client.post("/api/stock", json={"Name": "Mąka", "Unit": "kg", "Qty": 10, "Threshold": 5})
+    assert client.post("/api/stock/1/adjust", json={"Delta": -6}).status_code == 200
+
+    # świeże zdarzenie: transakcje z niższym ID mogą jeszcze trwać – kursor stoi
+    assert _events(client, 0) == {"LastId": 0, "Events": []}
+
+    later = _events(client, 0, now=local_now() + timedelta(seconds=10))
+    assert [ev["Type"] for ev in later["Events"]] == ["StockLow"]
+    assert later["LastId"] == later["Events"][0]["Id"]
+
+
+def test_events_stop_at_first_unsettled_row(app, client):
+    now = local_now()
+    with app.app_context():
+        db.session.add(Magazyn(ID=1, Nazwa="Mąka", Jednostka="kg", Ilosc=1, Niski_stan=True))
+        # ID 2 zapisany "teraz", ID 3 starszy (np. inny zegar) – nie przeskakujemy ID 2
+        for move_id, at in ((1, now - timedelta(seconds=30)), (2, now), (3, now - timedelta(seconds=30))):
+            db.session.add(MagazynRuchy(ID=move_id, Magazyn_ID=1, Zmiana=-1, Data=at, Zdarzenie="StockLow", Stan_po=1))
+        db.session.commit()
+
+        events = stock_events_after(0, settled_before=now - timedelta(seconds=5))
+    assert [ev["Id"] for ev in events] == [1]
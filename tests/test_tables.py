@@ -0,0 +1,24 @@
+import pytest
+
+from flask_api.auth import create_access_token
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        token = create_access_token(1, "test")
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    return client
+
+
+@pytest.mark.parametrize("value", ["inf", "-inf", "nan", "abc"])
+def test_viewport_rejects_non_finite_coordinates(client, value):
+    response = client.get(f"/api/tables/viewport?level=1&x1={value}&y1=0&x2=100&y2=100")
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("value", ["inf", "nan"])
+def test_nearest_free_rejects_non_finite_coordinates(client, value):
+    response = client.get(f"/api/tables/nearest-free?level=1&x={value}&y=0")
+    assert response.status_code == 400
@@ -0,0 +1,36 @@
+import pytest
+
+from flask_api.auth import create_access_token
+from flask_api.extensions import db
+from flask_api.models import Kelnerzy, KelnerzyStrefy, Logowanie, Pracownicy, Stoliki, StolikiStrefy, Strefa
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        db.create_all()
+        db.session.add(Strefa(ID=1, Nazwa="Sala"))
+        db.session.add(Stoliki(ID=1, Numer=1, Ile_osob=4, Strefa_ID=1))
+        db.session.add(Pracownicy(ID=1, Numer_prac=1, Nazwisko="Nowak", Imie="Anna", Tel="600100200"))
+        db.session.add(Logowanie(Pracownicy_ID=1, Login="anna", Haslo="x", Sol=""))
+        db.session.add(Kelnerzy(ID=1, Pracownicy_ID=1, Strefa_ID=1))
+        db.session.flush()
+        db.session.add(KelnerzyStrefy(Kelnerzy_ID=1, Strefa_ID=1))
+        db.session.add(StolikiStrefy(Stoliki_ID=1, Strefa_ID=1))
+        db.session.commit()
+        token = create_access_token(1, "test")
+
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    return client
+
+
+def test_staff_delete_invalidates_routing(client):
+    assert client.get("/api/waiters/1/tables").get_json()["TableIds"] == [1]
+    assert client.get("/api/tables/1/waiters").get_json()["Waiters"] == [{"WaiterId": 1, "StaffId": 1}]
+
+    assert client.delete("/api/staff/1").status_code == 200
+
+    assert client.get("/api/waiters/1/tables").status_code == 404
+    assert client.get("/api/tables/1/waiters").get_json()["Waiters"] == []
+    assert client.get("/api/table-groups").get_json()[0]["AssignedStaffIds"] == []